@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+import heapq
+from typing import Iterator
+
+import numpy as np
+
+from wireframe import Wireframe, Bounds
+
+
+@dataclass(eq=False)
+class BVHNode:
+  '''Nó da hierarquia. Folhas guardam um único objeto. Nós internos guardam a caixa que envolve as caixas de seus dois filhos.'''
+  box_min: np.ndarray
+  box_max: np.ndarray
+  parent: 'BVHNode | None' = None
+  left: 'BVHNode | None' = None
+  right: 'BVHNode | None' = None
+  object: Wireframe | None = None
+
+  @property
+  def is_leaf(self) -> bool:
+    return self.object is not None
+
+  def area(self) -> float:
+    '''Área da superfície da caixa, usada para escolher onde inserir novos objetos.'''
+    dx, dy, dz = self.box_max - self.box_min
+    return 2 * (dx*dy + dy*dz + dz*dx)
+
+  def fit_children(self) -> bool:
+    '''Ajusta a caixa para envolver as caixas dos filhos. Retorna se ela mudou.'''
+    box_min = np.minimum(self.left.box_min, self.right.box_min)
+    box_max = np.maximum(self.left.box_max, self.right.box_max)
+    changed = not (np.array_equal(box_min, self.box_min) and np.array_equal(box_max, self.box_max))
+    self.box_min, self.box_max = box_min, box_max
+    return changed
+
+  def subtree_objects(self) -> Iterator[Wireframe]:
+    stack = [self]
+    while stack:
+      node = stack.pop()
+      if node.is_leaf: yield node.object
+      else: stack.extend((node.right, node.left))
+
+class BVH:
+  '''Hierarquia de volumes envolventes (BVH) sobre as caixas alinhadas aos eixos (AABB) dos objetos da cena, para que consultas espaciais desçam apenas pelos ramos atingidos.
+  É construída de uma só vez com *build* e mantida incrementalmente por *insert*, *remove* e *refit*.
+  '''
+  def __init__(self, objects: list[Wireframe] | None = None):
+    self.root: BVHNode | None = None
+    self.leaves: dict[int, BVHNode] = {}
+    if objects: self.build(objects)
+
+  def __len__(self) -> int:
+    return len(self.leaves)
+
+  def __contains__(self, obj: Wireframe) -> bool:
+    return obj.wireframe_id in self.leaves
+
+  def build(self, objects: list[Wireframe]) -> None:
+    '''Reconstrói a árvore inteira, dividindo recursivamente os objetos pela mediana de seus centros ao longo do eixo de maior extensão.'''
+    self.leaves = {}
+    if not objects:
+      self.root = None
+      return
+    leaves = [self._leaf(obj) for obj in objects]
+    centers = np.array([(leaf.box_min + leaf.box_max) / 2 for leaf in leaves])
+    self.root = self._build(leaves, centers, np.arange(len(leaves)))
+
+  def _build(self, leaves: list[BVHNode], centers: np.ndarray, indices: np.ndarray) -> BVHNode:
+    if len(indices) == 1: return leaves[indices[0]]
+    axis = np.argmax(np.ptp(centers[indices], axis=0))
+    order = indices[np.argsort(centers[indices, axis], kind='stable')]
+    half = len(order) // 2
+    node = BVHNode(np.zeros(3), np.zeros(3))
+    node.left = self._build(leaves, centers, order[:half])
+    node.right = self._build(leaves, centers, order[half:])
+    node.left.parent = node.right.parent = node
+    node.fit_children()
+    return node
+
+  def _leaf(self, obj: Wireframe) -> BVHNode:
+    bounds = obj.bounds
+    leaf = BVHNode(bounds.box_min, bounds.box_max, object=obj)
+    self.leaves[obj.wireframe_id] = leaf
+    return leaf
+
+  def insert(self, obj: Wireframe) -> None:
+    '''Insere um objeto, descendo pelo filho cuja caixa menos cresceria ao envolvê-lo e pareando-o com a folha encontrada.'''
+    if obj in self: self.remove(obj)
+    leaf = self._leaf(obj)
+    if self.root is None:
+      self.root = leaf
+      return
+
+    sibling = self.root
+    while not sibling.is_leaf:
+      sibling = min((sibling.left, sibling.right), key=lambda child: self._enlarged_area(child, leaf) - child.area())
+
+    parent = BVHNode(np.zeros(3), np.zeros(3), sibling.parent, sibling, leaf)
+    self._replace_child(sibling, parent)
+    sibling.parent = leaf.parent = parent
+    self._refit_upwards(parent)
+
+  @staticmethod
+  def _enlarged_area(node: BVHNode, leaf: BVHNode) -> float:
+    dx, dy, dz = np.maximum(node.box_max, leaf.box_max) - np.minimum(node.box_min, leaf.box_min)
+    return 2 * (dx*dy + dy*dz + dz*dx)
+
+  def remove(self, obj: Wireframe) -> None:
+    '''Remove um objeto, colocando o irmão de sua folha no lugar do pai.'''
+    leaf = self.leaves.pop(obj.wireframe_id, None)
+    if leaf is None: return
+    parent = leaf.parent
+    if parent is None:
+      self.root = None
+      return
+    sibling = parent.left if parent.right is leaf else parent.right
+    sibling.parent = parent.parent
+    self._replace_child(parent, sibling)
+    if sibling.parent is not None: self._refit_upwards(sibling.parent)
+
+  def refit(self, obj: Wireframe) -> None:
+    '''Atualiza a caixa de um objeto transformado e das caixas que a contêm, sem reorganizar a árvore.'''
+    leaf = self.leaves.get(obj.wireframe_id)
+    if leaf is None: return
+    bounds = obj.bounds
+    leaf.box_min, leaf.box_max = bounds.box_min, bounds.box_max
+    if leaf.parent is not None: self._refit_upwards(leaf.parent)
+
+  def _replace_child(self, old: BVHNode, new: BVHNode) -> None:
+    parent = new.parent
+    if parent is None: self.root = new
+    elif parent.left is old: parent.left = new
+    else: parent.right = new
+
+  @staticmethod
+  def _refit_upwards(node: BVHNode | None) -> None:
+    # Sobe até a raiz, parando assim que uma caixa não mudar
+    while node is not None and node.fit_children(): node = node.parent
+
+  def query_frustum(self, planes: np.ndarray) -> list[Wireframe]:
+    '''Objetos cujas caixas não estão inteiramente fora de algum dos planos (a, b, c, d) do volume de visualização (ver Window.frustum_planes).
+    Ramos inteiramente fora ou inteiramente dentro são decididos sem visitar seus objetos.
+    '''
+    if self.root is None: return []
+    normals = planes[:, :3]
+    objects = []
+    stack = [self.root]
+    while stack:
+      node = stack.pop()
+      if not Bounds.box_in_frustum(node.box_min, node.box_max, planes): continue
+      nearest = np.where(normals > 0, node.box_min, node.box_max)
+      if node.is_leaf: objects.append(node.object)
+      elif np.all((nearest * normals).sum(axis=1) + planes[:, 3] >= 0): objects.extend(node.subtree_objects())
+      else: stack.extend((node.right, node.left))
+    return objects
+
+  def query_ray(self, origin: np.ndarray, direction: np.ndarray, radius: float = 0.0, spread: float = 0.0) -> Iterator[tuple[float, Wireframe]]:
+    '''Percorre os objetos cujas caixas, alargadas por radius + spread*t (ver Window.viewport_ray), são atingidas pelo raio origin + t*direction (t >= 0), em ordem crescente do t de entrada.
+    Quem procura o objeto mais próximo pode parar assim que o t de entrada passar do melhor acerto, sem visitar o resto da árvore.
+    '''
+    if self.root is None: return
+    origin = np.asarray(origin, dtype=float)[:3]
+    direction = np.asarray(direction, dtype=float)[:3]
+    parallel = direction == 0
+    inverse = 1 / np.where(parallel, 1.0, direction)
+    length2 = direction @ direction
+
+    def entry(node: BVHNode) -> float | None:
+      box_min, box_max = node.box_min, node.box_max
+      if radius or spread:
+        # A distância permitida é a do ponto da caixa mais adiantado ao longo do raio
+        t_far = np.maximum(direction * (box_min - origin), direction * (box_max - origin)).sum() / length2
+        margin = radius + spread * max(t_far, 0.0)
+        box_min, box_max = box_min - margin, box_max + margin
+      # Teste das faixas (slabs): o raio está dentro da caixa entre o maior t de entrada e o menor t de saída dos três eixos
+      # Nos eixos aos quais o raio é paralelo, basta que a origem esteja dentro da faixa
+      if np.any(parallel & ((origin < box_min) | (origin > box_max))): return None
+      t0 = (box_min - origin) * inverse
+      t1 = (box_max - origin) * inverse
+      t_enter = max(float(np.where(parallel, -np.inf, np.minimum(t0, t1)).max()), 0.0)
+      t_exit = float(np.where(parallel, np.inf, np.maximum(t0, t1)).min())
+      return t_enter if t_enter <= t_exit else None
+
+    queue: list[tuple[float, int, BVHNode]] = []
+    counter = 0  # Desempata nós com o mesmo t, que não são comparáveis
+    t = entry(self.root)
+    if t is not None: heapq.heappush(queue, (t, counter, self.root))
+    while queue:
+      t, _, node = heapq.heappop(queue)
+      if node.is_leaf:
+        yield t, node.object
+        continue
+      for child in (node.left, node.right):
+        t = entry(child)
+        if t is None: continue
+        counter += 1
+        heapq.heappush(queue, (t, counter, child))
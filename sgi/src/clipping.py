@@ -1,6 +1,7 @@
 from tkinter import IntVar
 from enum import Enum
 from wireframe import *
+import numpy as np
 
 import logging
 
@@ -14,12 +15,15 @@ class Code(Enum):
 class ClippingAlgorithm(Enum):
   COHEN_SUTHERLAND = 0
   LIANG_BARSKY = 1
+  GUARD_BAND = 2
 
   def __str__(self) -> str:
     if self == ClippingAlgorithm.COHEN_SUTHERLAND:
       return "Cohen-Sutherland"
     elif self == ClippingAlgorithm.LIANG_BARSKY:
       return "Liang-Barsky"
+    elif self == ClippingAlgorithm.GUARD_BAND:
+      return "Guard band"
     return "Unknown"
 
 class Clipping:
@@ -33,9 +37,13 @@ class Clipping:
   - Point clipping by checking if the point lies within the clipping window
   - Line clipping Cohen-Sutherland
   - Line clipping Liang-Barsky
-  - Polygon clipping Sutherland-Hodgman
+  - Polyline clipping that only clips the segments crossing the window border and keeps the rest connected
+  - Batch line clipping of many segments at once with NumPy, for both line algorithms
+  - Polygon clipping Sutherland-Hodgman, for many polygons at once with NumPy
   - Cubic Bezier curve clipping by approximating it with line segments and clipping each segment
+  - Guard-band clipping, which draws anything inside a band of GUARD_BAND pixels around the clipping window unclipped and masks it (see Viewport.draw_guard_band_mask)
   """
+  GUARD_BAND = 8192  # Pixels. Tk sends coordinates to the display as 16-bit integers, so the guard region must stay well within ±32767
 
   def __init__(self, width: int, height: int, padding: int, line_clipping_algorithm: IntVar):
     self._line_clipping_algorithm: IntVar = line_clipping_algorithm
@@ -48,11 +56,23 @@ class Clipping:
   def line_clipping_algorithm(self) -> ClippingAlgorithm:
     return ClippingAlgorithm(self._line_clipping_algorithm.get())
 
+  @property
+  def region(self) -> tuple[int, int, int, int]:
+    """The clipping window as (xmin, ymin, xmax, ymax)."""
+    return self.xmin, self.ymin, self.xmax, self.ymax
+
+  @property
+  def guard_region(self) -> tuple[int, int, int, int]:
+    """The guard-band region as (xmin, ymin, xmax, ymax)."""
+    return self.xmin - self.GUARD_BAND, self.ymin - self.GUARD_BAND, self.xmax + self.GUARD_BAND, self.ymax + self.GUARD_BAND
+
   def clip(self, object: WindowObject) -> WindowObject | None:
     """Clips an WindowObject, altering its points accordingly and returning it. If the object is completely outside the clipping window, returns None.
     
     "Line" is the only type of object that can be clipped by more than one algorithm. So the algorithm parameter is used to select which one to use for lines. Curves will also be affected, since they're approximated with lines for clipping.
+    Objects already known to be inside the clipping window (see WindowObject.inside) are returned as they are.
     """
+    if object.inside: return object
     match object:
       case WindowPointObject():
         if self.point_in_window(object.p.x, object.p.y): return object
@@ -60,9 +80,7 @@ class Clipping:
 
       case WindowLineObject():
         p1, p2 = object.start, object.end
-        if self.line_clipping_algorithm == ClippingAlgorithm.COHEN_SUTHERLAND: clipped = self.cohen_sutherland_clip(p1.x, p1.y, p2.x, p2.y)
-        elif self.line_clipping_algorithm == ClippingAlgorithm.LIANG_BARSKY: clipped = self.liang_barsky_clip(p1.x, p1.y, p2.x, p2.y)
-        else: return None
+        clipped = self.clip_line(p1.x, p1.y, p2.x, p2.y)
 
         if clipped is not None:
           x0, y0, x1, y1 = clipped
@@ -70,8 +88,14 @@ class Clipping:
           object.end = WindowPoint(x1, y1)
           return object
 
+      case WindowPolylineObject():
+        runs = [clipped_run for run in object.runs for clipped_run in self.clip_polyline(run)]
+        if runs:
+          object.runs = runs
+          return object
+
       case WindowPolygonObject():
-        new_points = self.sutherland_hodgman_clip(object.points)
+        new_points = self.clip_polygon_list([object.points])[0]
         if new_points is not None and len(new_points) >= 3:
           object.points = new_points
           return object
@@ -81,6 +105,101 @@ class Clipping:
         logging.error(f"Unknown object type: {type(object)}")
         return None
 
+  def clip_objects(self, objects: list[WindowObject]) -> list[WindowObject]:
+    """Clips a list of WindowObjects, keeping their order and dropping the ones completely outside the clipping window.
+    Lines, polyline runs and polygons are each clipped together in one batch, and points one at a time by clip.
+    """
+    lines = [object for object in objects if isinstance(object, WindowLineObject) and not object.inside]
+    runs = [run for object in objects if isinstance(object, WindowPolylineObject) and not object.inside for run in object.runs]
+    polygons = [object for object in objects if isinstance(object, WindowPolygonObject) and not object.inside]
+
+    segments = np.array([(line.start.x, line.start.y, line.end.x, line.end.y) for line in lines], dtype=float).reshape(-1, 4)
+    clipped, keep = self.clip_segments(segments)
+    kept_lines = [line for line, kept in zip(lines, keep.tolist()) if kept]
+    for line, (x0, y0, x1, y1) in zip(kept_lines, clipped.tolist()):
+      line.start = WindowPoint(x0, y0)
+      line.end = WindowPoint(x1, y1)
+    kept_ids = {id(line) for line in kept_lines}
+
+    clipped_runs = iter(self.clip_polylines(runs))
+    clipped_polygons = iter(self.clip_polygon_list([polygon.points for polygon in polygons]))
+    result = []
+    for object in objects:
+      if isinstance(object, WindowLineObject) and not object.inside:
+        if id(object) in kept_ids: result.append(object)
+      elif isinstance(object, WindowPolylineObject) and not object.inside:
+        object.runs = [clipped_run for _ in object.runs for clipped_run in next(clipped_runs)]
+        if object.runs: result.append(object)
+      elif isinstance(object, WindowPolygonObject) and not object.inside:
+        points = next(clipped_polygons)
+        if points is not None:
+          object.points = points
+          result.append(object)
+      else:
+        clipped_object = self.clip(object)
+        if clipped_object is not None: result.append(clipped_object)
+    return result
+
+  @staticmethod
+  def join_segments(segments: np.ndarray, run_ids: np.ndarray, count: int) -> list[list[list[WindowPoint]]]:
+    """Joins clipped segments (K, 4) back into the visible runs of each of the *count* polylines, given the polyline each segment came from in *run_ids*.
+    Consecutive segments stay in the same run when one starts exactly where the previous one ended.
+    """
+    result: list[list[list[WindowPoint]]] = [[] for _ in range(count)]
+    if len(segments) == 0: return result
+    breaks = np.ones(len(segments), dtype=bool)
+    breaks[1:] = (run_ids[1:] != run_ids[:-1]) | (segments[1:, :2] != segments[:-1, 2:]).any(axis=1)
+    starts = np.flatnonzero(breaks).tolist() + [len(segments)]
+    coordinates = segments.tolist()
+    for begin, end in zip(starts, starts[1:]):
+      run = [WindowPoint(*coordinates[begin][:2])]
+      run.extend(WindowPoint(x, y) for _, _, x, y in coordinates[begin:end])
+      result[int(run_ids[begin])].append(run)
+    return result
+
+  def clip_segments(self, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Clips an (N, 4) array of segments (x0, y0, x1, y1) with the selected line clipping algorithm, all at once.
+    Returns the clipped segments that are at least partially inside the clipping window and the boolean mask of which input segments were kept.
+    """
+    if self.line_clipping_algorithm == ClippingAlgorithm.COHEN_SUTHERLAND: return self.cohen_sutherland_clip_segments(segments)
+    elif self.line_clipping_algorithm == ClippingAlgorithm.LIANG_BARSKY: return self.liang_barsky_clip_segments(segments)
+    elif self.line_clipping_algorithm == ClippingAlgorithm.GUARD_BAND: return self.guard_band_clip_segments(segments)
+    return np.empty((0, 4)), np.zeros(len(segments), dtype=bool)
+
+  def clip_line(self, x0: float, y0: float, x1: float, y1: float) -> tuple[float, float, float, float] | None:
+    """Clips a line with the selected line clipping algorithm."""
+    if self.line_clipping_algorithm == ClippingAlgorithm.COHEN_SUTHERLAND: return self.cohen_sutherland_clip(x0, y0, x1, y1)
+    elif self.line_clipping_algorithm == ClippingAlgorithm.LIANG_BARSKY: return self.liang_barsky_clip(x0, y0, x1, y1)
+    elif self.line_clipping_algorithm == ClippingAlgorithm.GUARD_BAND: return self.guard_band_clip(x0, y0, x1, y1)
+    return None
+
+  def clip_polyline(self, points: list[WindowPoint]) -> list[list[WindowPoint]]:
+    """Clips a polyline, returning its visible runs (see clip_polylines)."""
+    return self.clip_polylines([points])[0]
+
+  def clip_polylines(self, polylines: list[list[WindowPoint]]) -> list[list[list[WindowPoint]]]:
+    """Clips many polylines at once, returning the visible runs of each one (see join_segments).
+    Segments are trivially accepted or rejected by their outcodes, so only the ones crossing the border go through clip_segments.
+    """
+    lengths = np.array([len(polyline) for polyline in polylines], dtype=int)
+    points = np.array([(p.x, p.y) for polyline in polylines for p in polyline], dtype=float).reshape(-1, 2)
+    polyline_ids = np.repeat(np.arange(len(polylines)), lengths)
+    # Segment i goes from point i to point i + 1 of the same polyline
+    first = np.flatnonzero(polyline_ids[1:] == polyline_ids[:-1])
+    codes = self.compute_out_codes(points[:, 0], points[:, 1])
+    code0, code1 = codes[first], codes[first + 1]
+    segments = np.hstack((points[first], points[first + 1]))
+
+    kept = (code0 | code1) == 0
+    crossing = np.flatnonzero(~kept & ((code0 & code1) == 0))
+    clipped, crossing_kept = self.clip_segments(segments[crossing])
+    # Endpoints inside the window are never moved, but Liang-Barsky may recompute them with a rounding error, which would split the run there
+    clipped[:, :2] = np.where((code0[crossing][crossing_kept] == 0)[:, None], segments[crossing[crossing_kept], :2], clipped[:, :2])
+    clipped[:, 2:] = np.where((code1[crossing][crossing_kept] == 0)[:, None], segments[crossing[crossing_kept], 2:], clipped[:, 2:])
+    segments[crossing[crossing_kept]] = clipped
+    kept[crossing[crossing_kept]] = True
+    return self.join_segments(segments[kept], polyline_ids[first][kept], len(polylines))
+
   def compute_out_code(self, x: float, y: float) -> int:
     """Used in the Cohen-Sutherland algorithm to compute the outcode of a point.
     
@@ -103,6 +222,18 @@ class Clipping:
       code |= Code.TOP.value
     return code
 
+  def compute_out_codes(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Computes the Cohen-Sutherland outcodes of many points at once. Same bits as compute_out_code."""
+    codes = np.where(x < self.xmin, Code.LEFT.value, np.where(x > self.xmax, Code.RIGHT.value, Code.INSIDE.value))
+    return codes | np.where(y < self.ymin, Code.BOTTOM.value, np.where(y > self.ymax, Code.TOP.value, Code.INSIDE.value))
+
+  def combined_out_codes(self, points: np.ndarray) -> tuple[int, int]:
+    """Computes the AND and the OR of the outcodes of an (N, 2) array of points.
+    A nonzero AND rejects, and a zero OR accepts, everything inside the points' convex hull.
+    """
+    codes = self.compute_out_codes(points[:, 0], points[:, 1])
+    return int(np.bitwise_and.reduce(codes)), int(np.bitwise_or.reduce(codes))
+
   def point_in_window(self, x: float, y: float) -> bool:
     return self.compute_out_code(x, y) == Code.INSIDE.value
 
@@ -143,13 +274,67 @@ class Clipping:
           x1, y1 = x, y
           out_code1 = self.compute_out_code(x1, y1)
 
-  def liang_barsky_clip(self, x0: float, y0: float, x1: float, y1: float) -> tuple[float, float, float, float] | None:
-    """Liang-Barsky clipping algorithm for a line"""
+  def cohen_sutherland_clip_segments(self, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Cohen-Sutherland clipping algorithm for an (N, 4) array of segments, moving one outside endpoint of every undecided segment per iteration, as cohen_sutherland_clip does."""
+    x0, y0, x1, y1 = (segments[:, i].astype(float) for i in range(4))
+    out_code0 = self.compute_out_codes(x0, y0)
+    out_code1 = self.compute_out_codes(x1, y1)
+    accepted = np.zeros(len(segments), dtype=bool)
+    rejected = np.zeros(len(segments), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      while True:
+        accepted |= ~rejected & ((out_code0 | out_code1) == 0)
+        rejected |= ~accepted & ((out_code0 & out_code1) != 0)
+        pending = np.flatnonzero(~(accepted | rejected))
+        if len(pending) == 0: break
+
+        c0, c1 = out_code0[pending], out_code1[pending]
+        px0, py0, px1, py1 = x0[pending], y0[pending], x1[pending], y1[pending]
+        out_code_out = np.where(c0 != 0, c0, c1)
+        top = (out_code_out & Code.TOP.value) != 0
+        bottom = ~top & ((out_code_out & Code.BOTTOM.value) != 0)
+        right = ~top & ~bottom & ((out_code_out & Code.RIGHT.value) != 0)
+        border_y = np.where(top, self.ymax, self.ymin)
+        border_x = np.where(right, self.xmax, self.xmin)
+        horizontal = top | bottom
+        x = np.where(horizontal, px0 + (px1 - px0) * (border_y - py0) / (py1 - py0), border_x)
+        y = np.where(horizontal, border_y, py0 + (py1 - py0) * (border_x - px0) / (px1 - px0))
+
+        first = c0 != 0
+        moved0, moved1 = pending[first], pending[~first]
+        x0[moved0], y0[moved0] = x[first], y[first]
+        x1[moved1], y1[moved1] = x[~first], y[~first]
+        out_code0[moved0] = self.compute_out_codes(x0[moved0], y0[moved0])
+        out_code1[moved1] = self.compute_out_codes(x1[moved1], y1[moved1])
+    return np.column_stack((x0, y0, x1, y1))[accepted], accepted
+
+  def liang_barsky_clip_segments(self, segments: np.ndarray, region: tuple[float, float, float, float] | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Liang-Barsky clipping algorithm for an (N, 4) array of segments. Clips to *region* (xmin, ymin, xmax, ymax) instead of the clipping window if given."""
+    xmin, ymin, xmax, ymax = region if region is not None else self.region
+    x0, y0, x1, y1 = (segments[:, i].astype(float) for i in range(4))
+    dx = x1 - x0
+    dy = y1 - y0
+
+    p = np.stack((-dx, dx, -dy, dy), axis=1)
+    q = np.stack((x0 - xmin, xmax - x0, y0 - ymin, ymax - y0), axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+      t = q / p
+    t_enter = np.maximum(np.where(p < 0, t, -np.inf).max(axis=1), 0.0)
+    t_exit = np.minimum(np.where(p > 0, t, np.inf).min(axis=1), 1.0)
+    keep = ~((p == 0) & (q < 0)).any(axis=1) & (t_enter <= t_exit)
+
+    x0, y0, dx, dy, t_enter, t_exit = x0[keep], y0[keep], dx[keep], dy[keep], t_enter[keep], t_exit[keep]
+    return np.column_stack((x0 + t_enter * dx, y0 + t_enter * dy, x0 + t_exit * dx, y0 + t_exit * dy)), keep
+
+  def liang_barsky_clip(self, x0: float, y0: float, x1: float, y1: float, region: tuple[float, float, float, float] | None = None) -> tuple[float, float, float, float] | None:
+    """Liang-Barsky clipping algorithm for a line. Clips to *region* (xmin, ymin, xmax, ymax) instead of the clipping window if given."""
+    xmin, ymin, xmax, ymax = region if region is not None else self.region
     dx = x1 - x0
     dy = y1 - y0
 
     p = [-dx, dx, -dy, dy]
-    q = [x0 - self.xmin, self.xmax - x0, y0 - self.ymin, self.ymax - y0]
+    q = [x0 - xmin, xmax - x0, y0 - ymin, ymax - y0]
 
     t_enter = 0.0
     t_exit = 1.0
@@ -175,126 +360,100 @@ class Clipping:
     y1_clip = y0 + t_exit * dy
     return x0_clip, y0_clip, x1_clip, y1_clip
 
-  def sutherland_hodgman_clip(self, current_points: list[WindowPoint]) -> list[WindowPoint] | None:
-    """Sutherland-Hodgman polygon clipping algorithm for polygons"""
-    new_points = []
-    # Left clipping
-    for i in range(0, len(current_points)+1):
-      prev = current_points[i - 1]
-      curr = current_points[i % len(current_points)]
-
-      # Edge completely to the left, ignore it
-      if prev.x < self.xmin and curr.x < self.xmin:
-        pass
-      # Edge completely to the right, add it to the output
-      elif prev.x >= self.xmin and curr.x >= self.xmin:
-        new_points.append(prev)
-      # Edge going out to the left, clip it
-      elif prev.x >= self.xmin and curr.x < self.xmin:
-        x = self.xmin
-        y = prev.y + (curr.y - prev.y) * (self.xmin - prev.x) / (curr.x - prev.x)
-        new_points.append(prev)
-        new_points.append(WindowPoint(x, y))
-      # Edge coming in from the left, clip it and add the current point
-      elif prev.x < self.xmin and curr.x >= self.xmin:
-        x = self.xmin
-        y = prev.y + (curr.y - prev.y) * (self.xmin - prev.x) / (curr.x - prev.x)
-        new_points.append(WindowPoint(x, y))
-        new_points.append(curr)
-
-    if len(new_points) == 0: return None
-    elif len(new_points) < 3:
-      # logging.warning(f"This point should not be reachable. {new_points=}")
-      return None
-    current_points = new_points.copy()
-    new_points = []
-
-    # Top clipping
-    for i in range(0, len(current_points)+1):
-      prev = current_points[i - 1]
-      curr = current_points[i % len(current_points)]
-
-      # Edge completely above, ignore it
-      if prev.y > self.ymax and curr.y > self.ymax:
-        pass
-      # Edge completely below, add it to the output
-      elif prev.y <= self.ymax and curr.y <= self.ymax:
-        new_points.append(prev)
-      # Edge going out above, clip it
-      elif prev.y <= self.ymax and curr.y > self.ymax:
-        y = self.ymax
-        x = prev.x + (curr.x - prev.x) * (self.ymax - prev.y) / (curr.y - prev.y)
-        new_points.append(prev)
-        new_points.append(WindowPoint(x, y))
-      # Edge coming in from above, clip it and add the current point
-      elif prev.y > self.ymax and curr.y <= self.ymax:
-        y = self.ymax
-        x = prev.x + (curr.x - prev.x) * (self.ymax - prev.y) / (curr.y - prev.y)
-        new_points.append(WindowPoint(x, y))
-        new_points.append(curr)
-    if len(new_points) == 0: return None
-    elif len(new_points) < 3:
-      #logging.warning(f"This point should not be reachable. {new_points=}")
-      return None
-    current_points = new_points.copy()
-    new_points = []
-
-    # Right clipping
-    for i in range(0, len(current_points)+1):
-      prev = current_points[i - 1]
-      curr = current_points[i % len(current_points)]
-
-      # Edge completely to the right, ignore it
-      if prev.x > self.xmax and curr.x > self.xmax:
-        pass
-      # Edge completely to the left, add it to the output
-      elif prev.x <= self.xmax and curr.x <= self.xmax:
-        new_points.append(prev)
-      # Edge going out to the right, clip it
-      elif prev.x <= self.xmax and curr.x > self.xmax:
-        x = self.xmax
-        y = prev.y + (curr.y - prev.y) * (self.xmax - prev.x) / (curr.x - prev.x)
-        new_points.append(prev)
-        new_points.append(WindowPoint(x, y))
-      # Edge coming in from the right, clip it and add the current point
-      elif prev.x > self.xmax and curr.x <= self.xmax:
-        x = self.xmax
-        y = prev.y + (curr.y - prev.y) * (self.xmax - prev.x) / (curr.x - prev.x)
-        new_points.append(WindowPoint(x, y))
-        new_points.append(curr)
-    if len(new_points) == 0: return None
-    elif len(new_points) < 3:
-      #logging.warning(f"This point should not be reachable. {new_points=}")
-      return None
-    current_points = new_points.copy()
-    new_points = []
-
-    # Bottom clipping
-    for i in range(0, len(current_points)+1):
-      prev = current_points[i - 1]
-      curr = current_points[i % len(current_points)]
-
-      # Edge completely below, ignore it
-      if prev.y < self.ymin and curr.y < self.ymin:
-        pass
-      # Edge completely above, add it to the output
-      elif prev.y >= self.ymin and curr.y >= self.ymin:
-        new_points.append(prev)
-      # Edge going out below, clip it
-      elif prev.y >= self.ymin and curr.y < self.ymin:
-        y = self.ymin
-        x = prev.x + (curr.x - prev.x) * (self.ymin - prev.y) / (curr.y - prev.y)
-        new_points.append(prev)
-        new_points.append(WindowPoint(x, y))
-      # Edge coming in from below, clip it and add the current point
-      elif prev.y < self.ymin and curr.y >= self.ymin:
-        y = self.ymin
-        x = prev.x + (curr.x - prev.x) * (self.ymin - prev.y) / (curr.y - prev.y)
-        new_points.append(WindowPoint(x, y))
-        new_points.append(curr)
-    if len(new_points) == 0: return None
-    elif len(new_points) < 3:
-      #logging.warning(f"This point should note be reachable. {new_points=}")
-      return None
-
-    return new_points if len(new_points) >= 3 else None
+  def in_guard_band(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Whether each point is inside the guard region."""
+    gxmin, gymin, gxmax, gymax = self.guard_region
+    return (xs >= gxmin) & (xs <= gxmax) & (ys >= gymin) & (ys <= gymax)
+
+  def guard_band_clip(self, x0: float, y0: float, x1: float, y1: float) -> tuple[float, float, float, float] | None:
+    """Guard-band clipping for a line: unchanged inside the guard region, dropped beyond a border of the clipping window, clipped to the guard region otherwise."""
+    if self.compute_out_code(x0, y0) & self.compute_out_code(x1, y1): return None
+    if self.in_guard_band(np.array([x0, x1]), np.array([y0, y1])).all(): return x0, y0, x1, y1
+    return self.liang_barsky_clip(x0, y0, x1, y1, self.guard_region)
+
+  def guard_band_clip_segments(self, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Guard-band clipping for an (N, 4) array of segments (see guard_band_clip)."""
+    x0, y0, x1, y1 = (segments[:, i] for i in range(4))
+    keep = (self.compute_out_codes(x0, y0) & self.compute_out_codes(x1, y1)) == 0
+    far = np.flatnonzero(keep & ~(self.in_guard_band(x0, y0) & self.in_guard_band(x1, y1)))
+    clipped = segments.astype(float)
+    far_clipped, far_keep = self.liang_barsky_clip_segments(clipped[far], self.guard_region)
+    clipped[far[far_keep]] = far_clipped
+    keep[far[~far_keep]] = False
+    return clipped[keep], keep
+
+  def guard_band_clip_polygons(self, polygons: list[list[WindowPoint]]) -> list[list[WindowPoint] | None]:
+    """Guard-band clipping for many polygons: dropped beyond a border of the clipping window, unchanged inside the guard region, clipped to the guard region otherwise (see clip_polygons)."""
+    visible = [len(points) >= 3 and not self.combined_out_codes(np.array([(p.x, p.y) for p in points], dtype=float))[0] for points in polygons]
+    clipped = iter(self.clip_polygons([points for points, shown in zip(polygons, visible) if shown], self.guard_region))
+    return [next(clipped) if shown else None for shown in visible]
+
+  def clip_polygon_list(self, polygons: list[list[WindowPoint]]) -> list[list[WindowPoint] | None]:
+    """Clips many polygons at once with the polygon clipping of the selected mode."""
+    if self.line_clipping_algorithm == ClippingAlgorithm.GUARD_BAND: return self.guard_band_clip_polygons(polygons)
+    return self.clip_polygons(polygons)
+
+  def sutherland_hodgman_clip(self, current_points: list[WindowPoint], region: tuple[float, float, float, float] | None = None) -> list[WindowPoint] | None:
+    """Sutherland-Hodgman polygon clipping algorithm for a polygon (see clip_polygons). Clips to *region* (xmin, ymin, xmax, ymax) instead of the clipping window if given."""
+    return self.clip_polygons([current_points], region)[0]
+
+  def clip_polygons(self, polygons: list[list[WindowPoint]], region: tuple[float, float, float, float] | None = None) -> list[list[WindowPoint] | None]:
+    """Sutherland-Hodgman polygon clipping algorithm for many polygons at once, each border clipping all of them in one pass. Clips to *region* (xmin, ymin, xmax, ymax) instead of the clipping window if given.
+    Returns the clipped points of each polygon, or None for polygons that end up with fewer than 3 points.
+    """
+    xmin, ymin, xmax, ymax = region if region is not None else self.region
+    region_min, region_max = np.array([xmin, ymin]), np.array([xmax, ymax])
+    result: list[list[WindowPoint] | None] = [None] * len(polygons)
+    indices = [i for i, polygon in enumerate(polygons) if len(polygon) >= 3]
+    if not indices: return result
+
+    lengths = np.array([len(polygons[i]) for i in indices])
+    points = np.array([(p.x, p.y) for i in indices for p in polygons[i]], dtype=float)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    box_min = np.minimum.reduceat(points, offsets[:-1])
+    box_max = np.maximum.reduceat(points, offsets[:-1])
+    inside = (box_min >= region_min).all(axis=1) & (box_max <= region_max).all(axis=1)
+    outside = ((box_max < region_min) | (box_min > region_max)).any(axis=1)
+    for i in np.flatnonzero(inside).tolist(): result[indices[i]] = polygons[indices[i]]
+
+    straddling = np.flatnonzero(~inside & ~outside)
+    if len(straddling) == 0: return result
+    polygon_ids = np.repeat(np.arange(len(straddling)), lengths[straddling])
+    points = points[np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in straddling.tolist()])]
+
+    # (axis, border, whether the inside is above the border)
+    for axis, border, above in ((0, xmin, True), (1, ymax, False), (0, xmax, False), (1, ymin, True)):
+      counts = np.bincount(polygon_ids, minlength=len(straddling))
+      starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+      # Previous vertex of each vertex in its own polygon, wrapping around
+      previous = np.arange(len(points)) - 1
+      nonempty = counts > 0
+      previous[starts[nonempty]] = (starts + counts - 1)[nonempty]
+
+      inside = points[:, axis] >= border if above else points[:, axis] <= border
+      crossing = inside != inside[previous]
+      # Edge (previous, current): the crossing point goes before the current vertex, which is kept if it is inside
+      prev_points, curr_points = points[previous[crossing]], points[crossing]
+      intersection = np.empty_like(curr_points)
+      other = 1 - axis
+      intersection[:, axis] = border
+      intersection[:, other] = prev_points[:, other] + (curr_points[:, other] - prev_points[:, other]) * (border - prev_points[:, axis]) / (curr_points[:, axis] - prev_points[:, axis])
+
+      emitted = crossing.astype(int) + inside
+      position = np.cumsum(emitted) - emitted
+      clipped = np.empty((emitted.sum(), 2))
+      clipped[position[crossing]] = intersection
+      clipped[position[inside] + crossing[inside]] = points[inside]
+      polygon_ids = np.repeat(polygon_ids, emitted)
+      points = clipped
+
+      # Polygons with fewer than 3 points are discarded
+      valid = np.bincount(polygon_ids, minlength=len(straddling))[polygon_ids] >= 3
+      points, polygon_ids = points[valid], polygon_ids[valid]
+
+    counts = np.bincount(polygon_ids, minlength=len(straddling))
+    coordinates = iter(points.tolist())
+    for i, count in zip(straddling.tolist(), counts.tolist()):
+      clipped_points = [WindowPoint(x, y) for x, y in (next(coordinates) for _ in range(count))]
+      if count >= 3: result[indices[i]] = clipped_points
+    return result
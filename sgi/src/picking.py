@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from enum import Enum
+
+import numpy as np
+
+from wireframe import Wireframe
+
+
+class PickKind(Enum):
+  '''Elemento de um Wireframe atingido por um clique.'''
+  VERTEX = 0
+  EDGE = 1
+  FACE = 2
+  CURVE = 3
+  SURFACE = 4
+
+  def __str__(self) -> str:
+    if self == PickKind.VERTEX: return "Vértice"
+    elif self == PickKind.EDGE: return "Aresta"
+    elif self == PickKind.FACE: return "Face"
+    elif self == PickKind.CURVE: return "Curva"
+    elif self == PickKind.SURFACE: return "Superfície"
+    return "Unknown"
+
+@dataclass
+class Pick:
+  '''Resultado de uma seleção por raio: o objeto atingido, o parâmetro t do raio no ponto atingido e qual de seus elementos foi atingido.'''
+  object: Wireframe
+  t: float
+  kind: PickKind
+  index: int  # Index of the vertex, edge, face, curve or surface in the object
+
+def pick_object(obj: Wireframe, origin: np.ndarray, direction: np.ndarray, radius: float = 0.0, spread: float = 0.0, curve_coefficient: int = 20, curve_tolerance: float | None = None) -> Pick | None:
+  '''Testa o raio origin + t*direction (t >= 0) contra os elementos de um objeto (ver Window.viewport_ray).
+  Linhas são atingidas a uma distância de até radius + spread*t do raio, e faces em seu interior. Vértices têm preferência sobre arestas, faces, curvas e superfícies, nessa ordem.
+  '''
+  points = (obj.vertices @ obj.model_matrix.T)[:, :3]
+  # Os vértices de curvas e superfícies são pontos de controle, que não são desenhados
+  control_points = bool(obj.curves or obj.surfaces)
+  for kind, hits in (
+    (PickKind.VERTEX, np.empty(0) if control_points else ray_point_hits(points, origin, direction, radius, spread)),
+    (PickKind.EDGE, ray_segment_hits(points[obj.edges[:, 0]], points[obj.edges[:, 1]], origin, direction, radius, spread)),
+    (PickKind.FACE, ray_face_hits(obj, points, origin, direction)),
+    (PickKind.CURVE, ray_curve_hits(obj, origin, direction, radius, spread, curve_coefficient, curve_tolerance)),
+    (PickKind.SURFACE, ray_surface_hits(obj, origin, direction, radius, spread)),
+  ):
+    if np.isfinite(hits).any():
+      index = int(np.argmin(hits))
+      return Pick(obj, float(hits[index]), kind, index)
+  return None
+
+def ray_point_hits(points: np.ndarray, origin: np.ndarray, direction: np.ndarray, radius: float, spread: float) -> np.ndarray:
+  '''Parâmetro t do ponto do raio mais próximo de cada ponto (N, 3), ou inf para os pontos fora da tolerância.'''
+  t = np.maximum((points - origin) @ direction / (direction @ direction), 0.0)
+  distance = np.linalg.norm(origin + t[:, None] * direction - points, axis=1)
+  return np.where(distance <= radius + spread * t, t, np.inf)
+
+def ray_segment_hits(starts: np.ndarray, ends: np.ndarray, origin: np.ndarray, direction: np.ndarray, radius: float, spread: float) -> np.ndarray:
+  '''Parâmetro t do ponto do raio mais próximo de cada segmento (starts[i], ends[i]), ou inf para os segmentos fora da tolerância.'''
+  edge = ends - starts
+  a = direction @ direction
+  c = (edge * edge).sum(axis=1)
+  # Closest point of the segment to the ray's line, then the closest point of the ray to it
+  with np.errstate(divide='ignore', invalid='ignore'):
+    b = edge @ direction
+    offset = origin - starts
+    denominator = a * c - b * b
+    u = np.where(denominator > 1e-12 * a * c, (a * (offset * edge).sum(axis=1) - b * (offset @ direction)) / denominator, 0.0)
+  u = np.clip(np.nan_to_num(u), 0.0, 1.0)
+  t = np.maximum(((starts + u[:, None] * edge - origin) @ direction) / a, 0.0)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    u = np.clip(np.nan_to_num((((origin + t[:, None] * direction) - starts) * edge).sum(axis=1) / c), 0.0, 1.0)
+  distance = np.linalg.norm(origin + t[:, None] * direction - (starts + u[:, None] * edge), axis=1)
+  return np.where(distance <= radius + spread * t, t, np.inf)
+
+def ray_curve_hits(obj: Wireframe, origin: np.ndarray, direction: np.ndarray, radius: float, spread: float, curve_coefficient: int, curve_tolerance: float | None = None) -> np.ndarray:
+  '''Parâmetro t do ponto do raio mais próximo de cada curva do objeto, ou inf para as curvas fora da tolerância.'''
+  hits = np.full(len(obj.curves), np.inf)
+  for i, curve in enumerate(obj.curves):
+    points, _ = curve.tessellate(obj.vertices[curve.control_points], curve_coefficient, obj.local_tolerance(curve_tolerance))
+    points = (points @ obj.model_matrix.T)[:, :3]
+    if len(points) > 1: hits[i] = ray_segment_hits(points[:-1], points[1:], origin, direction, radius, spread).min()
+  return hits
+
+def ray_surface_hits(obj: Wireframe, origin: np.ndarray, direction: np.ndarray, radius: float, spread: float) -> np.ndarray:
+  '''Parâmetro t do ponto do raio mais próximo de cada superfície do objeto, ou inf para as superfícies fora da tolerância.'''
+  hits = np.full(len(obj.surfaces), np.inf)
+  for i, surface in enumerate(obj.surfaces):
+    grid = (surface.tessellate(obj.vertices[surface.control_points]) @ obj.model_matrix.T)[..., :3]
+    starts = np.concatenate((grid[:, :-1].reshape(-1, 3), grid[:-1].reshape(-1, 3)))
+    ends = np.concatenate((grid[:, 1:].reshape(-1, 3), grid[1:].reshape(-1, 3)))
+    if len(starts): hits[i] = ray_segment_hits(starts, ends, origin, direction, radius, spread).min()
+  return hits
+
+def ray_face_hits(obj: Wireframe, points: np.ndarray, origin: np.ndarray, direction: np.ndarray) -> np.ndarray:
+  '''Parâmetro t em que o raio atravessa cada face do objeto, ou inf para as faces não atingidas, pelo teste de Möller-Trumbore sobre um leque de triângulos por face.'''
+  offsets, indices = obj.faces.offsets, obj.faces.indices
+  hits = np.full(len(obj.faces), np.inf)
+  triangles = np.maximum(np.diff(offsets) - 2, 0)
+  if triangles.sum() == 0: return hits
+  face = np.repeat(np.arange(len(triangles)), triangles)
+  corner = np.arange(len(face)) - np.repeat(np.cumsum(triangles) - triangles, triangles)
+  p0 = points[indices[offsets[face]]]
+  e1 = points[indices[offsets[face] + corner + 1]] - p0
+  e2 = points[indices[offsets[face] + corner + 2]] - p0
+
+  p = np.cross(direction, e2)
+  determinant = (e1 * p).sum(axis=1)
+  # Triangles parallel to the ray (or degenerate) are never hit
+  crossing = np.abs(determinant) > 1e-12
+  face, p0, e1, e2, p, determinant = face[crossing], p0[crossing], e1[crossing], e2[crossing], p[crossing], determinant[crossing]
+  inverse = 1 / determinant
+  to_origin = origin - p0
+  u = (to_origin * p).sum(axis=1) * inverse
+  q = np.cross(to_origin, e1)
+  v = (q @ direction) * inverse
+  t = (e2 * q).sum(axis=1) * inverse
+  hit = (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+  np.minimum.at(hits, face[hit], t[hit])
+  return hits
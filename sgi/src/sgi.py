@@ -25,6 +25,7 @@ class SGI:
     height: int=900,
     curve_type: int=0,
     curve_coefficient: int=100,
+    curve_tessellation: int=0,
     surface_type: int=0,
     surface_algorithm_type: int=0,
     surface_degree: tuple[int, int]=(4, 4),
@@ -66,6 +67,7 @@ class SGI:
     self.line_clipping_algorithm = tk.IntVar(value=line_clipping_algorithm)
     self.curve_type = tk.IntVar(value=curve_type)
     self.curve_coefficient = tk.IntVar(value=curve_coefficient)
+    self.curve_tessellation = tk.IntVar(value=curve_tessellation)
     
     self.surface_type = tk.IntVar(value=surface_type)
     self.surface_algorithm_type = tk.IntVar(value=surface_algorithm_type)
@@ -104,12 +106,16 @@ class SGI:
 
     clipping_submenu.add_radiobutton(label="Cohen-Sutherland", value=0, variable=self.line_clipping_algorithm)
     clipping_submenu.add_radiobutton(label="Liang-Barsky", value=1, variable=self.line_clipping_algorithm)
+    clipping_submenu.add_radiobutton(label="Guard band", value=2, variable=self.line_clipping_algorithm)
     
     projection_submenu.add_radiobutton(label="Paralela", value=0, variable=self.projection_type, command=self.viewport.update)
     projection_submenu.add_radiobutton(label="Perspectiva", value=1, variable=self.projection_type, command=self.viewport.update)
 
     curve_submenu.add_radiobutton(label="Bézier", value=0, variable=self.curve_type)
     curve_submenu.add_radiobutton(label="B-Spline", value=1, variable=self.curve_type)
+    curve_submenu.add_separator()
+    curve_submenu.add_radiobutton(label="Uniforme", value=0, variable=self.curve_tessellation, command=self.viewport.update)
+    curve_submenu.add_radiobutton(label="Adaptativa", value=1, variable=self.curve_tessellation, command=self.viewport.update)
     curve_submenu.add_command(label="Grau de continuidade", command=lambda: (
       popup := self.popup(250, 100, "Grau de continuidade"),
       tk.Label(popup, text="Grau de continuidade:").pack(),
@@ -202,6 +208,7 @@ class SGI:
       self.height,
       self.curve_type,
       self.curve_coefficient,
+      self.curve_tessellation,
       self.surface_type,
       self.surface_algorithm_type,
       self.surface_degree,
@@ -344,6 +351,7 @@ class SGI:
         "line_clipping_algorithm": self.line_clipping_algorithm.get(),
         "curve_type": self.curve_type.get(),
         "curve_coefficient": self.curve_coefficient.get(),
+        "curve_tessellation": self.curve_tessellation.get(),
         "surface_type": self.surface_type.get(),
         "surface_algorithm_type": self.surface_algorithm_type.get(),
         "surface_degree": self.surface_degree,
@@ -522,7 +530,7 @@ class SGI:
         elif form_type in ("polygon", "face"):
           raw_input = inputs['points'].get().strip()
           matches = re.findall(r"\(([^()]+)\)", raw_input)
-          points = [list(map(float, m.split(","))) for m in matches]
+          points = np.array([[*map(float, m.split(",")), 1.0] for m in matches])
           self.viewport.add_polygon(points=points, name=name,
                                     #line_color=inputs['line_color'].get().strip(),
                                     texture=inputs['line_color'].get().strip(),
@@ -532,20 +540,21 @@ class SGI:
           raw = raw.strip("()").replace(" ", "")
           points_str = raw.split("),(")
           points = [list(map(float, p.split(','))) for p in points_str]
-          points = [np.append(np.array(p), 1.0) for p in points]
+          points = np.array([[*p, 1.0] for p in points])
           self.viewport.add_curve(control_points=points, name=name,
                                   texture=inputs['line_color'].get().strip(),
                                   thickness=int(inputs['thickness'].get()) if inputs['thickness'].get().isnumeric() else 1)
         elif form_type == "surface":
           default_matrix = self.parse_matrix_control_points(default_values.get("control_points", ""))
-          control_points: list[WorldPoint] = []
+          control_points: list[tuple[float, float, float, float]] = []
           for point in default_matrix:
               coords = point.strip("()").replace(" ", "").split(",")
               if len(coords) == 3:
                   x = float(coords[0])
                   y = float(coords[1])
                   z = float(coords[2])
-                  control_points.append(np.array([x, y, z, 1.0]))
+                  control_points.append((x, y, z, 1.0))
+          control_points = np.array(control_points)
           self.viewport.add_surface(control_points=control_points, name=name,
                                     degree=self.surface_degree,
                                     #line_color=inputs['line_color'].get().strip(),
@@ -648,6 +657,7 @@ class SGI:
           target.rotate(angle, point, a1, a2)
         except ValueError:
           target.rotate(angle, None, a1, a2)
+        self.viewport.refit_object(target)
 
     self.viewport.update()
 
@@ -667,6 +677,7 @@ class SGI:
     if dx == 0 and dy == 0 and dz == 0: return
 
     target.translate(dx, dy, dz)
+    self.viewport.refit_object(target)
     self.viewport.update()
 
   def scale_selected_object(self):
@@ -679,5 +690,6 @@ class SGI:
       self.log("Erro: Valores de escala inválidos.")
       return
     target.scale(s)
+    self.viewport.refit_object(target)
     self.viewport.update()
     
\ No newline at end of file
@@ -0,0 +1,61 @@
+import numpy as np
+
+from clipping import Clipping
+from my_types import WindowPoint
+
+clipping = Clipping(1000, 750, 15, None)
+rng = np.random.default_rng(0)
+
+# Random segments around the window, plus horizontal, vertical, degenerate and border-touching ones
+segments = rng.uniform(-600, 1600, (4000, 4))
+segments[:500, 3] = segments[:500, 1]
+segments[500:1000, 2] = segments[500:1000, 0]
+segments[1000:1200, 2:] = segments[1000:1200, :2]
+segments[1200:1400, 0] = clipping.xmin
+segments[1400:1600, 3] = clipping.ymax
+segments[1600:1800] = rng.uniform(-2e4, 2e4, (200, 4))
+
+# Batched line clippers against their scalar versions, one segment at a time
+for name, clip_segments, clip_line in (
+  ("Cohen-Sutherland", clipping.cohen_sutherland_clip_segments, clipping.cohen_sutherland_clip),
+  ("Liang-Barsky", clipping.liang_barsky_clip_segments, clipping.liang_barsky_clip),
+  ("Guard band", clipping.guard_band_clip_segments, clipping.guard_band_clip),
+):
+  clipped, keep = clip_segments(segments)
+  expected = [clip_line(*segment) for segment in segments.tolist()]
+  expected_keep = np.array([line is not None for line in expected])
+  if not np.array_equal(keep, expected_keep):
+    print(f"Error: {name} kept {keep.sum()} segments, expected {expected_keep.sum()}")
+  elif len(clipped) != len(expected_keep.nonzero()[0]) or not np.allclose(clipped, [line for line in expected if line is not None], rtol=1e-12, atol=1e-9):
+    print(f"Error: {name} clipped segments differ from the scalar algorithm")
+
+# Batched Sutherland-Hodgman against the per-polygon algorithm, one border and one polygon at a time
+def reference_clip(points, region):
+  xmin, ymin, xmax, ymax = region
+  for axis, border, above in ((0, xmin, True), (1, ymax, False), (0, xmax, False), (1, ymin, True)):
+    def inside(point): return point[axis] >= border if above else point[axis] <= border
+    def intersection(prev, curr):
+      other = prev[1 - axis] + (curr[1 - axis] - prev[1 - axis]) * (border - prev[axis]) / (curr[axis] - prev[axis])
+      return (border, other) if axis == 0 else (other, border)
+    clipped = []
+    for i, curr in enumerate(points):
+      prev = points[i - 1]
+      if inside(curr) != inside(prev): clipped.append(intersection(prev, curr))
+      if inside(curr): clipped.append(curr)
+    if len(clipped) < 3: return None
+    points = clipped
+  return points
+
+polygons = []
+for _ in range(3000):
+  center = rng.uniform(-300, 1300, 2)
+  angles = np.sort(rng.uniform(0, 2 * np.pi, rng.integers(3, 12)))
+  radii = rng.uniform(10, 600, len(angles))
+  polygons.append([WindowPoint(x, y) for x, y in center + np.column_stack((np.cos(angles), np.sin(angles))) * radii[:, None]])
+polygons.append([WindowPoint(0, 0), WindowPoint(1, 1)])
+
+for region in (clipping.region, clipping.guard_region, (400, 300, 401, 301)):
+  for i, (clipped, polygon) in enumerate(zip(clipping.clip_polygons(polygons, region), polygons)):
+    expected = reference_clip([(p.x, p.y) for p in polygon], region) if len(polygon) >= 3 else None
+    if (clipped is None) != (expected is None) or (clipped is not None and (len(clipped) != len(expected) or not np.allclose([(p.x, p.y) for p in clipped], expected))):
+      print(f"Error: polygon {i} clipped to {region} differs from the per-polygon algorithm")
@@ -0,0 +1,37 @@
+import numpy as np
+
+from wireframe import Curve, CurveType
+
+rng = np.random.default_rng(0)
+
+# Bézier curves from the Bernstein basis matrix against bezier_algorithm, one point at a time
+for degree in (2, 3, 4, 6):
+  for segments in (1, 3):
+    for steps in (1, 7, 20):
+      curve = Curve(CurveType.BEZIER, [], degree=degree)
+      control_points = rng.uniform(-500, 500, (segments * (degree - 1) + 1, 3))
+      points = curve.generate_bezier_points(control_points, steps)
+      expected = [control_points[:1, :2]]
+      for segment in curve.bezier_segments(control_points):
+        expected.append([(p.x, p.y) for p in (Curve.bezier_algorithm(t, *segment) for t in np.arange(1, steps + 1) / steps)])
+      expected = np.concatenate(expected)
+      if points.shape != (len(expected), 3) or not np.allclose(points[:, :2], expected, rtol=0, atol=1e-9):
+        print(f"Error: Bézier curve of degree {degree}, {segments} segments and {steps} steps differs from direct evaluation")
+
+# B-Spline forward differences against the matrix form [t³ t² t 1] M G, evaluated directly at each step
+M = np.array([
+  [-1, 3, -3, 1],
+  [3, -6, 3, 0],
+  [-3, 0, 3, 0],
+  [1, 4, 1, 0]
+]) / 6
+for count in (4, 5, 9):
+  for steps in (1, 7, 20, 100):
+    curve = Curve(CurveType.B_SPLINE, [])
+    control_points = rng.uniform(-500, 500, (count, 3))
+    points = curve.generate_b_spline_points(control_points, steps)
+    t = (np.arange(steps + 1) / steps)[:, None]
+    T = np.hstack((t**3, t**2, t, np.ones_like(t)))
+    expected = np.concatenate([T @ M @ control_points[i:i + 4] for i in range(count - 3)])
+    if points.shape != expected.shape or not np.allclose(points, expected, rtol=0, atol=1e-7):
+      print(f"Error: B-Spline with {count} control points and {steps} steps differs from direct evaluation")
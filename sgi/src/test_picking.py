@@ -0,0 +1,31 @@
+import numpy as np
+
+from picking import PickKind, pick_object
+from wireframe import Wireframe
+
+# Cube of side 100 centered at the origin, with its six faces and no edges
+vertices = [[x, y, z] for x in (-50, 50) for y in (-50, 50) for z in (-50, 50)]
+faces = [([0, 1, 3, 2], None), ([4, 6, 7, 5], None), ([0, 4, 5, 1], None), ([2, 3, 7, 6], None), ([0, 2, 6, 4], None), ([1, 5, 7, 3], None)]
+cube = Wireframe(0, "Cubo", vertices, faces=faces)
+
+def check(name, origin, direction, radius, kind, t):
+  picked = pick_object(cube, np.array(origin, dtype=float), np.array(direction, dtype=float), radius)
+  if kind is None:
+    if picked is not None: print(f"Error: {name}: expected no pick, got {picked.kind} at t = {picked.t}")
+  elif picked is None or picked.kind != kind or abs(picked.t - t) > 1e-9:
+    print(f"Error: {name}: expected {kind} at t = {t}, got {picked and (picked.kind, picked.t)}")
+
+check("face", [10, 20, -500], [0, 0, 1], 0.0, PickKind.FACE, 450)
+check("face from inside", [10, 20, 0], [0, 0, 1], 0.0, PickKind.FACE, 50)
+check("vertex", [49, 49, -500], [0, 0, 1], 2.0, PickKind.VERTEX, 450)
+check("miss", [80, 0, -500], [0, 0, 1], 2.0, None, 0)
+check("behind", [0, 0, 500], [0, 0, 1], 0.0, None, 0)
+check("parallel to faces", [0, 0, -500], [1, 0, 0], 0.0, None, 0)
+
+# Transforms are read from the model matrix without touching the vertices
+cube.translate(200, 0, 0)
+check("translated miss", [10, 20, -500], [0, 0, 1], 0.0, None, 0)
+check("translated face", [210, 20, -500], [0, 0, 1], 0.0, PickKind.FACE, 450)
+cube.rotate(45, None, 0, 1)
+check("rotated face", [200 + 60, 0, -500], [0, 0, 1], 0.0, PickKind.FACE, 450)
+check("rotated vertex", [200 + 50 * np.sqrt(2), 0, -500], [0, 0, 1], 1.0, PickKind.VERTEX, 450)
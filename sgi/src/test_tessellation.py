@@ -0,0 +1,37 @@
+import numpy as np
+
+from wireframe import Curve, CurveType, Surface, SurfaceAlgorithmType, SurfaceType, Wireframe
+
+# One frame as drawn by the viewport: project the object through its model matrix and list its world vertices
+def draw(obj, curve_tolerance=None):
+  matrix = obj.model_matrix
+  obj.window_objects(obj.vertices @ matrix.T, matrix, 20, None, 1e-3, curve_tolerance)
+  obj.world_vertices
+
+rng = np.random.default_rng(0)
+
+for curve_type in CurveType:
+  for tolerance in (None, 0.5):
+    curve = Wireframe(0, "Curva", rng.uniform(-100, 100, (7, 3)), curves=[Curve(curve_type, list(range(7)), degree=3)])
+    draw(curve, tolerance)
+    points = curve.curves[0]._tessellation[1]
+    vertices = curve.vertices.copy()
+    curve.rotate(30, None, 0, 2)
+    curve.translate(10, -20, 5)
+    for _ in range(2): draw(curve, tolerance)
+    if curve.curves[0]._tessellation[1] is not points: print(f"Error: {curve_type} curve (tolerance {tolerance}) was tessellated again after a transform")
+    if not np.array_equal(curve.vertices, vertices): print(f"Error: drawing {curve_type} curve changed its vertices")
+
+for surface_type in SurfaceType:
+  for algorithm in SurfaceAlgorithmType:
+    grid = np.array([[x, y, 0] for x in range(0, 400, 100) for y in range(0, 400, 100)], dtype=float)
+    grid[:, 2] = rng.uniform(-50, 50, len(grid))
+    surface = Wireframe(0, "Superfície", grid, surfaces=[Surface(surface_type, algorithm, list(range(16)))])
+    draw(surface)
+    mesh = surface.surfaces[0]._mesh[1]
+    vertices = surface.vertices.copy()
+    surface.rotate(30, None, 1, 2)
+    surface.scale(2)
+    for _ in range(2): draw(surface)
+    if surface.surfaces[0]._mesh[1] is not mesh: print(f"Error: {surface_type} surface ({algorithm}) was tessellated again after a transform")
+    if not np.array_equal(surface.vertices, vertices): print(f"Error: drawing {surface_type} surface ({algorithm}) changed its vertices")
@@ -1,4 +1,5 @@
 from typing import Callable
+from dataclasses import dataclass
 
 from tkinter import Canvas, Event, IntVar, ttk
 import numpy as np
@@ -7,9 +8,22 @@ import random
 
 from wireframe import *
 from window import *
-from clipping import Clipping
+from clipping import Clipping, ClippingAlgorithm
+from bvh import BVH
+from picking import Pick, pick_object
 from my_types import WorldPoint
 
+@dataclass
+class ProjectionCache:
+  '''Resultado da projeção e do recorte de um Wireframe.
+
+  Continua válido enquanto a chave não mudar. A chave é composta pela versão do objeto, pela versão da câmera e pelos parâmetros de desenho.
+  Quando a chave muda, os mesmos buffers são reaproveitados para o novo resultado, sem alterar o Wireframe de origem.
+  '''
+  key: tuple
+  projected_vertices: np.ndarray  # (N, 4) homogeneous coordinates, before the perspective divide
+  draw_list: list[WindowObject]
+
 class Viewport:
   '''Gerencia a janela de visualização de objetos 3D, incluindo a renderização, manipulação e interação com o usuário.
 
@@ -17,6 +31,8 @@ class Viewport:
 
   Esses objetos são então projetados por meio de uma instância da classe Window, que lida com a projeção 3D para 2D. E então, os objetos projetados são recortados usando uma instância da classe Clipping, que aplica algoritmos de recorte de linha e polígonos antes de desenhá-los na tela.
   '''
+  CURVE_TOLERANCE = 0.5  # Pixels
+
   def __init__(
     self,
     canva: Canvas,
@@ -28,6 +44,7 @@ class Viewport:
     height: int,
     curve_type: IntVar,
     curve_coefficient: IntVar,
+    curve_tessellation: IntVar,
     surface_type: IntVar,
     surface_algorithm_type: IntVar,
     surface_degree: tuple[int, int],
@@ -63,11 +80,14 @@ class Viewport:
       line_clipping_algorithm,
     )
     self.curve_coefficient = curve_coefficient
+    self._curve_tessellation: IntVar = curve_tessellation
 
     self.id_counter: int
     self.objects: list[Wireframe]
     self.objects = Wireframe.load_file(input_file)
     self.id_counter = len(self.objects)
+    # Hierarquia de caixas envolventes dos objetos, usada nas consultas espaciais da cena
+    self.bvh = BVH(self.objects)
     self.building_buffer: list[WorldPoint] = []
     self.building: bool = False
     self.debug: bool = debug
@@ -78,6 +98,7 @@ class Viewport:
 
     self.log = log_function
     self.object_list: ttk.Treeview = object_list
+    self.projection_cache: dict[int, ProjectionCache] = {}
 
     self.update()
     self.update_object_list()
@@ -86,6 +107,19 @@ class Viewport:
   def curve_type(self) -> CurveType:
     return CurveType(self._curve_type.get())
   
+  @property
+  def curve_tessellation(self) -> CurveTessellation:
+    return CurveTessellation(self._curve_tessellation.get())
+
+  @property
+  def curve_tolerance(self) -> float | None:
+    '''Tolerância de planicidade das curvas no mundo, equivalente a CURVE_TOLERANCE pixels na tela, ou None se as curvas são geradas de forma uniforme.
+
+    É arredondada para baixo até uma potência de 2, para que pequenas mudanças de zoom não obriguem a gerar as curvas novamente.
+    '''
+    if self.curve_tessellation != CurveTessellation.ADAPTIVE: return None
+    return float(2.0 ** np.floor(np.log2(self.CURVE_TOLERANCE / self.window.zoom)))
+
   @property
   def surface_type(self) -> SurfaceType:
     return SurfaceType(self._surface_type.get())
@@ -97,6 +131,7 @@ class Viewport:
   def save_objects(self, path: str):
     with open(path, "w") as f:
       for obj in self.objects:
+        obj.bake()
         f.write(f"{obj}\n")
 
   def is_click_inside_window(self, x: int, y: int) -> bool:
@@ -106,28 +141,66 @@ class Viewport:
     '''Registra o clique do usuário na tela.
 
     Caso o usuário esteja em modo de construção, adiciona o ponto clicado ao buffer de construção.
-    Caso contrário, cria um novo objeto ponto na posição clicada.
+    Caso contrário, seleciona o objeto sob o clique, se houver, ou cria um novo objeto ponto na posição clicada.
     '''
     if not self.is_click_inside_window(event.x, event.y): return
 
     world_point = self.window.viewport_to_world(event.x, event.y)
     if self.building: self.building_buffer.append(world_point)
+    elif (picked := self.pick(event.x, event.y)) is not None:
+      # Clicar sobre um objeto o seleciona na lista de objetos
+      self.update()
+      self.select_object(picked.object)
+      self.log(f"{picked.kind} {picked.index} de '{picked.object.name}' selecionado.")
+      return
     else:
-      self.objects.append(Wireframe(self.id_counter, "Clique", [world_point]))
+      self.add_object(Wireframe(self.id_counter, "Clique", np.array([world_point])))
       self.id_counter += 1
 
     self.update()
     
+  def add_object(self, obj: Wireframe):
+    self.objects.append(obj)
+    self.bvh.insert(obj)
+
+  def pick(self, x: int, y: int, tolerance: float = 5.0) -> Pick | None:
+    '''Encontra o objeto mais próximo sob o pixel (x, y) da tela, lançando um raio pela cena a partir da janela.
+
+    A BVH entrega os objetos cujas caixas o raio atravessa em ordem de distância, então a busca termina assim que a próxima caixa estiver além do melhor acerto.
+    Todos os elementos são testados no mundo, com uma tolerância de *tolerance* pixels.
+    '''
+    origin, direction, radius, spread = self.window.viewport_ray(x, y, tolerance)
+    best: Pick | None = None
+    for t, obj in self.bvh.query_ray(origin, direction, radius, spread):
+      if best is not None and t > best.t: break
+      picked = pick_object(obj, origin, direction, radius, spread, self.curve_coefficient.get(), self.curve_tolerance)
+      if picked is not None and (best is None or picked.t < best.t): best = picked
+    return best
+
+  def select_object(self, target: Wireframe):
+    '''Seleciona o objeto na lista de objetos.'''
+    for item in self.object_list.get_children():
+      if str(self.object_list.item(item)['tags'][0]) == str(target.wireframe_id):
+        self.object_list.selection_set(item)
+        self.object_list.see(item)
+        return
+
   def remove_object(self, target: Wireframe):
     self.objects = [obj for obj in self.objects if obj.wireframe_id != target.wireframe_id] 
+    self.bvh.remove(target)
     self.update()
 
+  def refit_object(self, target: Wireframe):
+    '''Deve ser chamado após transformar um objeto da cena, para que sua caixa envolvente seja atualizada na BVH.'''
+    self.bvh.refit(target)
+
   def move_window(self, event: Event):
-    self.window.position = self.window.viewport_to_world(event.x, event.y)
+    self.window.move_to(self.window.viewport_to_world(event.x, event.y))
     self.update()
 
   def clear(self):
     self.objects.clear()
+    self.bvh.build(self.objects)
     self.building = False
     self.building_buffer.clear()
     self.update()
@@ -140,7 +213,6 @@ class Viewport:
     self.update_object_list()
 
     self.canva.delete("all")
-    all_objects = [obj.copy() for obj in self.objects]
     # Se o modo debug estiver ativado, desenha elementos auxiliares na tela, como a grade e o centro da tela
     if self.debug:
       self.build_debug_grid()
@@ -152,13 +224,20 @@ class Viewport:
 
     # Ordena os objetos por distância da janela antes de desenhá-los
     # Dessa forma, objetos mais distantes são desenhados primeiro e, então, cobertos por objetos mais próximos
-    for object in sorted(all_objects, key=lambda obj: obj.distance(self.window.position), reverse=True):
-      # Projeta os vértices do objeto na janela de visualização
-      object.projected_vertices = self.window.project(object.vertices)
-      for window_object in object.window_objects(self.curve_coefficient.get(), self.surface_degree):
-        # Recorta objetos cujas posições na janela estejam além dos limites da tela de exibição.
-        clipped = self.clipper.clip(window_object)
-        if clipped is not None: clipped.draw(self.canva, object.texture, object.thickness, object.line_color)
+    # Objetos cuja caixa envolvente está inteiramente fora do volume de visualização não são projetados, gerados nem recortados
+    # A BVH descarta ramos inteiros da cena sem visitar seus objetos
+    visible_objects = self.bvh.query_frustum(self.window.frustum_planes())
+
+    # Apenas objetos alterados, ou todos caso a câmera tenha mudado, são projetados e recortados novamente
+    draw_parameters = (self.window.version, self.curve_coefficient.get(), self.clipper.line_clipping_algorithm, self.curve_tolerance)
+    projection_cache: dict[int, ProjectionCache] = {}
+    # Em caso de empate, objetos criados antes são desenhados primeiro
+    for object in sorted(visible_objects, key=lambda obj: (obj.distance(self.window.position), -obj.wireframe_id), reverse=True):
+      cache = self.project_object(object, draw_parameters)
+      projection_cache[object.wireframe_id] = cache
+      for window_object in cache.draw_list: window_object.draw(self.canva, object.texture, object.thickness, object.line_color)
+    # Objetos removidos da cena deixam de ter suas projeções armazenadas
+    self.projection_cache = projection_cache
 
     # Aplica o mesmo processo de projeção e recorte para os pontos que estão na lista de construção
     # A única diferença é a construção manual das linhas entre os pontos
@@ -172,6 +251,40 @@ class Viewport:
         if line: line.draw(self.canva, 'red', 1)
       prev = point
 
+    # No modo guard band, o que foi desenhado sem recorte além da janela de recorte é escondido por uma máscara
+    if self.clipper.line_clipping_algorithm == ClippingAlgorithm.GUARD_BAND:
+      self.draw_guard_band_mask()
+      if self.debug: self.draw_viewport_border()
+
+  def project_object(self, object: Wireframe, draw_parameters: tuple) -> ProjectionCache:
+    '''Retorna a projeção e a lista de objetos recortados de *object*, reutilizando o resultado anterior se nem o objeto nem os parâmetros de desenho mudaram.'''
+    key = (object.version, *draw_parameters)
+    cache = self.projection_cache.get(object.wireframe_id)
+    if cache is not None and cache.key == key: return cache
+    if cache is None: cache = ProjectionCache(key, np.empty((0, 4)), [])
+
+    # Projeta todos os vértices do objeto na janela de visualização de uma só vez, reaproveitando o buffer da projeção anterior
+    # A divisão por w fica para depois do recorte contra o plano próximo
+    buffer = cache.projected_vertices if cache.projected_vertices.shape == (len(object.vertices), 4) else None
+    cache.projected_vertices = self.window.project_homogeneous(object.vertices, object.model_matrix, out=buffer)
+    cache.key = key
+    cache.draw_list.clear()
+
+    # Arestas, faces, curvas e superfícies estão no fecho convexo dos vértices, então, com todos os vértices à frente do plano próximo, os códigos de região de todos eles decidem o objeto inteiro
+    # Objetos inteiramente além de uma mesma borda não são gerados, e objetos inteiramente dentro da janela não são recortados
+    in_window = False
+    if len(object.vertices) and (cache.projected_vertices[:, 3] >= self.window.near).all():
+      all_codes, any_codes = self.clipper.combined_out_codes(homogeneous_divide(cache.projected_vertices))
+      if all_codes: return cache
+      in_window = any_codes == 0
+
+    window_objects = object.window_objects(cache.projected_vertices, self.window.view_projection @ object.model_matrix, draw_parameters[1], self.surface_degree, self.window.near, draw_parameters[3], self.clipper.region)
+    if in_window: cache.draw_list.extend(window_objects)
+    # Recorta objetos cujas posições na janela estejam além dos limites da tela de exibição.
+    # Todas as linhas do objeto, incluindo os segmentos de suas linhas poligonais, são recortadas juntas
+    else: cache.draw_list.extend(self.clipper.clip_objects(window_objects))
+    return cache
+
   def update_object_list(self):
     for item in self.object_list.get_children(): self.object_list.delete(item)
     for obj in self.objects: 
@@ -180,7 +293,7 @@ class Viewport:
         "end",
         values=(
           obj.name,
-          ", ".join(f"({', '.join(f'{coord:.2f}' for coord in point)})" for point in obj.vertices)),
+          ", ".join(f"({', '.join(f'{coord:.2f}' for coord in point)})" for point in obj.vertices @ obj.model_matrix.T)),
           tags=(str(obj.wireframe_id),
         )
       )
@@ -219,6 +332,14 @@ class Viewport:
     origin = self.window.world_to_viewport(np.array([0, 0, 0]))
     self.canva.create_text(origin[0] + 15, origin[1] - 10, text="(0,0)", fill="black", font=("Arial", 10, "bold"))
 
+  def draw_guard_band_mask(self):
+    '''Cobre, com a cor de fundo do canvas, tudo o que está entre a janela de recorte e o limite da região de guarda (ver Clipping).'''
+    xmin, ymin, xmax, ymax = self.clipper.region
+    gxmin, gymin, gxmax, gymax = self.clipper.guard_region
+    background = self.canva.cget("background")
+    for x0, y0, x1, y1 in ((gxmin, gymin, gxmax, ymin), (gxmin, ymax, gxmax, gymax), (gxmin, ymin, xmin, ymax), (xmax, ymin, gxmax, ymax)):
+      self.canva.create_rectangle(x0, y0, x1, y1, fill=background, outline=background, width=0)
+
   def draw_viewport_border(self):
     x0, y0, x1, y1 = self.window.get_corners()
     self.canva.create_rectangle(x0, y0, x1, y1, outline="red", width=1)
@@ -232,7 +353,7 @@ class Viewport:
       else: self.cancel_building()
       self.update()
     else:
-      self.objects.pop()
+      self.bvh.remove(self.objects.pop())
       self.update()
 
   def toggle_building(self):
@@ -254,12 +375,12 @@ class Viewport:
         self.log("Polígono precisa de ao menos 3 pontos.")
         return
       else:
-        self.objects.append(Wireframe(
+        self.add_object(Wireframe(
           self.id_counter,
           "Polígono",
-          vertices=self.building_buffer.copy(),
-          edges=[(i, (i+1) % len(self.building_buffer)) for i in range(len(self.building_buffer))],
-          faces=[([i for i in range(len(self.building_buffer))], None)]
+          vertices=np.array(self.building_buffer),
+          edges=Wireframe.loop_edges(len(self.building_buffer)),
+          faces=Faces(np.array([0, len(self.building_buffer)]), np.arange(len(self.building_buffer)), [None])
         ))
         self.id_counter += 1
         self.cancel_building()
@@ -275,12 +396,10 @@ class Viewport:
     thickness: int=1,
     texture: str="#000000"
   ):
-    self.objects.append(Wireframe(
+    self.add_object(Wireframe(
       self.id_counter,
       name,
-      vertices=[point],
-      edges=[],
-      faces=[],
+      vertices=np.array([point]),
       thickness=thickness,
       texture=texture
     ))
@@ -295,12 +414,11 @@ class Viewport:
     thickness: int=1,
     texture: str="#000000"
   ):
-    self.objects.append(Wireframe(
+    self.add_object(Wireframe(
       self.id_counter,
       name,
-      vertices=[p1, p2],
-      edges=[(0, 1)],
-      faces=[],
+      vertices=np.array([p1, p2]),
+      edges=np.array([[0, 1]]),
       thickness=thickness,
       texture=texture
     ))
@@ -309,7 +427,7 @@ class Viewport:
 
   def add_polygon(
     self,
-    points: list[WorldPoint],
+    points: np.ndarray,
     name: str="Polygon",
     line_color: str="#000000",
     texture: str | None = None,
@@ -317,12 +435,12 @@ class Viewport:
   ):
     if len(points) < 3:
       raise Exception("Polígono precisa de ao menos 3 pontos.")
-    self.objects.append(Wireframe(
+    self.add_object(Wireframe(
       self.id_counter,
       name,
-      vertices=points,
-      edges=[(i, (i+1) % len(points)) for i in range(len(points))],
-      faces=[([i], texture) for i in range(len(points))],
+      vertices=np.array(points),
+      edges=Wireframe.loop_edges(len(points)),
+      faces=Faces.from_list([([i], texture) for i in range(len(points))]),
       line_color=line_color,
       thickness=thickness,
       texture=texture
@@ -337,20 +455,19 @@ class Viewport:
     If multiple points are stored, add line segments between each pair of consecutive points.
     """
     if len(self.building_buffer) == 1:
-      self.objects.append(Wireframe(
+      self.add_object(Wireframe(
         self.id_counter,
         "Clique",
-        vertices=[self.building_buffer[0]]
+        vertices=np.array([self.building_buffer[0]])
       ))
       self.id_counter += 1
 
     for i in range(len(self.building_buffer) - 1):
-      start, end = self.building_buffer[i:i+2]
-      self.objects.append(Wireframe(
+      self.add_object(Wireframe(
         self.id_counter,
         "Linha",
-        vertices=[start, end],
-        edges=[(0, 1)],
+        vertices=np.array(self.building_buffer[i:i+2]),
+        edges=np.array([[0, 1]]),
       ))
       self.id_counter += 1
 
@@ -359,7 +476,7 @@ class Viewport:
 
   def add_curve(
     self,
-    control_points: list[WorldPoint],
+    control_points: np.ndarray,
     name: str="Curve",
     texture: str="#000000",
     thickness: int=1
@@ -370,12 +487,12 @@ class Viewport:
     new_curve = Wireframe(
       self.id_counter,
       name,
-      vertices=control_points,
+      vertices=np.array(control_points),
       curves=[Curve(self.curve_type, list(range(len(control_points))), degree=min(4, len(control_points)))],
       texture=texture,
       thickness=thickness
     )
-    self.objects.append(new_curve)
+    self.add_object(new_curve)
     self.id_counter += 1
     self.update()
 
@@ -384,19 +501,18 @@ class Viewport:
       raise Exception("Erro: Pelo menos quatro pontos são necessários para formar uma curva de Bézier.")
     elif len(self.building_buffer) == 2:
       self.log("Apenas dois pontos foram inseridos. Adicionando uma linha ao invés de uma curva.")
-      start, end = self.building_buffer
-      self.objects.append(Wireframe(
+      self.add_object(Wireframe(
         self.id_counter,
         "Linha",
-        vertices=[start, end],
-        edges=[(0, 1)],
+        vertices=np.array(self.building_buffer),
+        edges=np.array([[0, 1]]),
       ))
     else:
       if len(self.building_buffer) == 3: self.log("Apenas três pontos foram inseridos. Adicionando uma curva quadrática ao invés de uma cúbica.")
-      self.objects.append(Wireframe(
+      self.add_object(Wireframe(
         self.id_counter,
         "Curva",
-        vertices=self.building_buffer.copy(),
+        vertices=np.array(self.building_buffer),
         curves=[
           Curve(self.curve_type, 
                 list(range(len(self.building_buffer))), 
@@ -409,7 +525,7 @@ class Viewport:
 
   def add_surface(
     self,
-    control_points: list[WorldPoint],
+    control_points: np.ndarray,
     degree: tuple[int, int],
     name: str="Surface",
     surface_steps: int=10,
@@ -428,7 +544,7 @@ class Viewport:
     new_surface = Wireframe(
       self.id_counter,
       name,
-      vertices=control_points,
+      vertices=np.array(control_points),
       surfaces=[Surface(
         self.surface_type,
         self.surface_algorithm_type,
@@ -443,7 +559,7 @@ class Viewport:
       texture=texture,
       thickness=thickness
     )
-    self.objects.append(new_surface)
+    self.add_object(new_surface)
     self.id_counter += 1
     self.update()
 
@@ -455,6 +571,7 @@ class Viewport:
 
     seed = datetime.now().second + hash(form_type)
     random.seed(seed)
+    if target_object: target_object.bake()
 
     match form_type:
       case 'point':
@@ -1,4 +1,5 @@
 from tkinter import IntVar
+from functools import wraps
 
 import numpy as np
 from my_types import WorldPoint, WindowPoint
@@ -10,6 +11,75 @@ def normalize(v: WorldPoint | list[float]) -> WorldPoint:
   norm = np.linalg.norm(v)
   return v / norm if norm != 0 else v
 
+def to_homogeneous(points: np.ndarray | list[WorldPoint]) -> np.ndarray:
+  """Convert a set of points to an (N, 4) array of homogeneous coordinates, appending w = 1 to 3D points."""
+  points = np.asarray(points, dtype=float)
+  if points.size == 0: return np.empty((0, 4))
+  points = points.reshape(len(points), -1)
+  if points.shape[1] == 3: points = np.column_stack((points, np.ones(len(points))))
+  return points
+
+def homogeneous_divide(points: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+  """Divide the (x, y) columns of an (N, 4) array of homogeneous coordinates by w. Points with w = 0 are sent to infinity.
+
+  If *out* is an (N, 2) array, the result is written to it instead of a new array.
+  """
+  w = points[:, 3]
+  with np.errstate(divide='ignore', invalid='ignore'):
+    projected = np.divide(points[:, :2], w[:, None], out=out)
+  projected[w == 0] = float('inf')
+  return projected
+
+def clip_segments_near(starts: np.ndarray, ends: np.ndarray, near: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """Clip segments given by two (E, 4) arrays of homogeneous endpoints against the plane w = near, before the perspective divide.
+
+  Endpoints with w < near are moved along the segment to where it crosses the plane. Segments entirely behind it are dropped.
+  Returns the clipped starts and ends of the kept segments and the boolean mask of which segments were kept.
+  """
+  w0, w1 = starts[:, 3], ends[:, 3]
+  keep = (w0 >= near) | (w1 >= near)
+  starts, ends, w0, w1 = starts[keep], ends[keep], w0[keep], w1[keep]
+  # Only segments with one endpoint on each side are cut, so w0 != w1 wherever t is used
+  with np.errstate(divide='ignore', invalid='ignore'):
+    t = ((w0 - near) / (w0 - w1))[:, None]
+    crossing = starts + t * (ends - starts)
+  return np.where((w0 < near)[:, None], crossing, starts), np.where((w1 < near)[:, None], crossing, ends), keep
+
+def clip_polygon_near(points: np.ndarray, near: float) -> np.ndarray:
+  """Clip a polygon given by an (K, 4) array of homogeneous vertices against the plane w = near (Sutherland-Hodgman with a single plane)."""
+  inside = points[:, 3] >= near
+  if inside.all(): return points
+  clipped = []
+  for i in range(len(points)):
+    prev, curr = points[i - 1], points[i]
+    if inside[i] != inside[i - 1]: clipped.append(prev + (prev[3] - near) / (prev[3] - curr[3]) * (curr - prev))
+    if inside[i]: clipped.append(curr)
+  return np.array(clipped).reshape(-1, 4)
+
+def clip_polyline_near(points: np.ndarray, near: float) -> list[np.ndarray]:
+  """Clip a polyline given by an (K, 4) array of homogeneous points against the plane w = near, before the perspective divide.
+
+  Returns the visible runs of the polyline as (L, 4) arrays of at least two points. Each crossing of the plane ends or starts a run.
+  """
+  in_front = points[:, 3] >= near
+  if in_front.all(): return [points] if len(points) > 1 else []
+  starts, ends, keep = clip_segments_near(points[:-1], points[1:], near)
+  runs: list[list[np.ndarray]] = []
+  for i, start, end in zip(np.flatnonzero(keep).tolist(), starts, ends):
+    # A segment continues the current run only if the previous segment was kept and they meet in front of the plane
+    if not (i > 0 and keep[i - 1] and in_front[i]): runs.append([start])
+    runs[-1].append(end)
+  return [np.array(run) for run in runs]
+
+def changes_camera(method):
+  """Decorator for Window methods that move, rotate or zoom the camera, bumping its version after the change."""
+  @wraps(method)
+  def wrapper(self: 'Window', *args, **kwargs):
+    result = method(self, *args, **kwargs)
+    self.invalidate()
+    return result
+  return wrapper
+
 class Window:
   '''Representa uma janela de visualização num espaço de n dimensões.
   Por meio de seus atributos de posição e orientação, é possível calcular a posição relativa de pontos no espaço 3D e projetá-los na janela.
@@ -42,8 +112,15 @@ class Window:
     self.max_zoom = 100.0
     self.min_zoom = 0.1
     self.padding = 15
+    self.near = 0.1  # Points with w below this, behind or too close to the center of projection, are clipped away before the perspective divide
     self.projection_type = projection_type
 
+    # Every change to the camera bumps its version, so consumers can reuse anything computed for an unchanged camera
+    self.version: int = 0
+    self._view_projection: np.ndarray = np.eye(4)
+    self._view_projection_version: int = -1
+    self.projection_type.trace_add("write", lambda *_: self.invalidate())
+
     # Calculate the right and up vectors based on the normal vector and the given up vector
     if np.array_equal(self.normal, up) or np.array_equal(self.normal, -normalize(up)):
       self.right = np.array([1, 0, 0])
@@ -56,30 +133,73 @@ class Window:
   def chosen_projection(self):
     return self.perspective_projection if self.projection_type.get() == 1 else self.paralel_projection
 
+  @property
+  def view_projection(self) -> np.ndarray:
+    """4x4 matrix taking homogeneous world points to homogeneous viewport coordinates (x, y, depth, w).
+
+    It composes the chosen projection with the window to viewport transform and is only rebuilt when the camera version changes.
+    """
+    if self._view_projection_version != self.version:
+      projection = self.perspective_matrix() if self.projection_type.get() == 1 else self.paralel_matrix()
+      self._view_projection = self.viewport_matrix() @ projection
+      self._view_projection_version = self.version
+    return self._view_projection
+
+  def frustum_planes(self) -> np.ndarray:
+    """Planes bounding the region of the world visible in the clipping window, as rows (a, b, c, d) of a (5, 4) array.
+
+    A point p is inside the frustum when a*x + b*y + c*z + d >= 0 for every plane.
+    The planes come straight from the rows of the view-projection matrix: with w > 0, the viewport x = X/w is right of xmin exactly when X - xmin*w >= 0, and so on for the other borders.
+    The last one is the near plane w = near.
+    """
+    X, Y, _, W = self.view_projection
+    xmin, ymin, xmax, ymax = self.get_corners()
+    return np.array([X - xmin*W, xmax*W - X, Y - ymin*W, ymax*W - Y, W - [0, 0, 0, self.near]])
+
+  def invalidate(self):
+    """Marks the camera as changed, discarding the cached view-projection matrix."""
+    self.version += 1
+
+  @changes_camera
   def move_up(self): self.position[1] += max(self.movement_speed/self.zoom, 1.0)
 
+  @changes_camera
   def move_down(self): self.position[1] -= max(self.movement_speed/self.zoom, 1.0)
 
+  @changes_camera
   def move_left(self): self.position[0] -= max(self.movement_speed/self.zoom, 1.0)
 
+  @changes_camera
   def move_right(self): self.position[0] += max(self.movement_speed/self.zoom, 1.0)
 
+  @changes_camera
   def move_below(self): self.position[2] -= max(self.movement_speed/self.zoom, 1.0)
 
+  @changes_camera
   def move_above(self): self.position[2] += max(self.movement_speed/self.zoom, 1.0)
 
+  @changes_camera
   def move_forward(self): self.position += self.normal * self.movement_speed
 
+  @changes_camera
   def move_backward(self): self.position -= self.normal * self.movement_speed
 
+  @changes_camera
   def move_sideways_right(self): self.position -= self.right * self.movement_speed
 
+  @changes_camera
   def move_sideways_left(self): self.position += self.right * self.movement_speed
 
+  @changes_camera
   def move_upward(self): self.position += self.up * self.movement_speed
 
+  @changes_camera
   def move_downward(self): self.position -= self.up * self.movement_speed
 
+  @changes_camera
+  def move_to(self, position: WorldPoint): self.position = np.array(position[:3], dtype=float)
+
+  @changes_camera
   def rotate(self, angle: int | None = None, a1: int=0, a2: int=1):
     """Rotate the window around the normal vector."""
     angle = angle if angle is not None else self.rotation_speed
@@ -95,12 +215,15 @@ class Window:
     self.normal = np.cross(self.up, self.right)
     self.focus = self.position - 1000*self.normal
 
+  @changes_camera
   def zoom_in(self, x, y):
     if self.zoom <= self.max_zoom: self.zoom *= 1.1
 
+  @changes_camera
   def zoom_out(self, x, y):
     if self.zoom >= self.min_zoom: self.zoom /= 1.1
 
+  @changes_camera
   def recenter(self):
     self.position = np.array([0, 0, 100], dtype=float)
     self.normal = np.array([0, 0, -1], dtype=float)
@@ -111,32 +234,54 @@ class Window:
     self.window_focus = WindowPoint(0, 0)
     self.window_focus_1 = WindowPoint(self.width // 2, self.height // 2)
 
-  def project(self, points: list[WorldPoint]) -> list[WindowPoint]:
-    return [self.world_to_viewport(point) for point in points]
+  def project(self, points: np.ndarray | list[WorldPoint], model: np.ndarray | None = None, out: np.ndarray | None = None) -> np.ndarray:
+    """Project a whole set of world points to viewport coordinates at once.
 
-  def world_to_viewport(self, point: WorldPoint) -> WindowPoint:
-    window_point = self.world_to_window(point)
+    *points* is an (N, 4) array (or anything convertible to one) and the result is an (N, 2) array with the viewport (x, y) of each point.
+    If a *model* matrix is given, it is applied to the points first, folded into the view-projection matrix.
+    An existing (N, 2) array may be passed as *out* to be reused as the output buffer.
+    """
+    return homogeneous_divide(self.project_homogeneous(points, model), out)
+
+  def project_homogeneous(self, points: np.ndarray | list[WorldPoint], model: np.ndarray | None = None, out: np.ndarray | None = None) -> np.ndarray:
+    """Same as project, but stops before the perspective divide, returning the (N, 4) homogeneous viewport coordinates (x, y, depth, w).
+
+    An existing (N, 4) array may be passed as *out* to be reused as the output buffer.
+    """
+    matrix = self.view_projection if model is None else self.view_projection @ model
+    return np.matmul(to_homogeneous(points), matrix.T, out=out)
 
+  def world_to_viewport(self, point: WorldPoint) -> WindowPoint:
     # Convert the window view plane coordinates to viewport coordinates
     # - Centering the window plane origin at the center of the viewport
     # - Scaling the coordinates by the zoom factor
     # - Adjusting the y-coordinate to match the canvas coordinate system
-    return self.window_to_viewport(window_point)
+    return WindowPoint(*self.project([point])[0])
 
   def world_to_window(self, point: WorldPoint) -> WindowPoint:
     return self.chosen_projection(point)
 
   def perspective_projection(self, point: WorldPoint) -> WindowPoint:
-    point = point[:3]  # Ignore the homogeneous coordinate if present
-    m = np.array([self.right, self.up, point - self.focus]).T
+    return WindowPoint(*homogeneous_divide(to_homogeneous([point[:3]]) @ self.perspective_matrix().T)[0])
+
+  def perspective_matrix(self) -> np.ndarray:
+    """Perspective projection onto the window view plane as a 4x4 matrix over homogeneous coordinates.
+
+    For each point p, the window coordinates (x, y) solve the system [right, up, p - focus] @ (x, y, z) = focus - position.
+    Only the last column depends on p, so by Cramer's rule x and y are ratios of linear functions of p, which become the rows of the matrix.
+    The rows are negated so that w is positive for points in front of the center of projection. The depth row is the distance to the window plane.
+    """
     r = self.focus - self.position
+    M = np.zeros((4, 4))
+    M[2, :3] = self.normal
+    M[2, 3] = -np.dot(self.normal, self.position)
+    # Projection center on the window plane: w = 0 sends every point to infinity
+    if np.dot(self.normal, r) == 0: return M
 
-    if np.linalg.det(m) == 0 or np.dot(self.normal, r) == 0:
-      return WindowPoint(float('inf'), float('inf'))
-    
-    x, y, z = np.linalg.solve(m, r)
-    # if z == 0: return WindowPoint(float('inf'), float('inf'))
-    return WindowPoint(x, y)
+    rows = -np.array([np.cross(r, self.up), np.cross(self.right, r), np.cross(self.right, self.up)])
+    M[[0, 1, 3], :3] = rows
+    M[[0, 1, 3], 3] = -rows @ self.focus
+    return M
 
   def _perspective_projection(self, point: WorldPoint) -> WindowPoint:
     point = point[:3]  # Ignore the homogeneous coordinate if present
@@ -171,14 +316,18 @@ class Window:
     return WindowPoint(x, y)
 
   def paralel_projection(self, point: WorldPoint) -> WindowPoint:
-    point = point[:3]  # Ignore the homogeneous coordinate if present
-    # Project the point onto the window view plane
-    t = sum(self.normal[i] * (self.position[i] - point[i]) for i in range(len(point)))
-    t /= sum(self.normal[i] * self.normal[i] for i in range(len(point)))
-    c = np.array([point[i] + t * self.normal[i] for i in range(len(point))])
-
-    v = c - self.position
-    return WindowPoint(np.dot(v, self.right), np.dot(v, self.up))
+    return WindowPoint(*homogeneous_divide(to_homogeneous([point[:3]]) @ self.paralel_matrix().T)[0])
+
+  def paralel_matrix(self) -> np.ndarray:
+    """Parallel projection onto the window view plane as a 4x4 matrix over homogeneous coordinates."""
+    # Project the point onto the window view plane along the normal, then measure it along the right and up vectors
+    n = self.normal
+    right = self.right - np.dot(self.right, n) / np.dot(n, n) * n
+    up = self.up - np.dot(self.up, n) / np.dot(n, n) * n
+    M = np.eye(4)
+    M[:3, :3] = [right, up, n]
+    M[:3, 3] = -M[:3, :3] @ self.position
+    return M
 
   def window_to_world(self, x: float, y: float) -> WorldPoint:
     # Return a 3D point based on the window's position and orientation
@@ -192,6 +341,15 @@ class Window:
     point.y = self.height - point.y
     return point
 
+  def viewport_matrix(self) -> np.ndarray:
+    """The *window_to_viewport* transform as a 4x4 matrix over homogeneous coordinates."""
+    return np.array([
+      [self.zoom, 0, 0, self.window_focus_1.x],
+      [0, -self.zoom, 0, self.height - self.window_focus_1.y],
+      [0, 0, 1, 0],
+      [0, 0, 0, 1]
+    ], dtype=float)
+
   def viewport_to_window(self, x: float, y: float) -> tuple[float, float]:
     y = self.height - y
     x = (x-self.window_focus_1.x)/self.zoom
@@ -201,6 +359,20 @@ class Window:
   def viewport_to_world(self, x: float, y: float) -> WorldPoint:
     return self.window_to_world(*self.viewport_to_window(x, y))
     
+  def viewport_ray(self, x: float, y: float, tolerance: float = 0.0) -> tuple[np.ndarray, np.ndarray, float, float]:
+    """Ray of the world points that project onto the viewport pixel (x, y), as (origin, direction, radius, spread).
+
+    A point origin + t*direction (t >= 0) projects within *tolerance* pixels of (x, y) when its distance to the ray is at most radius + spread*t.
+    In the parallel projection the ray leaves the window along its normal. In the perspective projection it leaves the center of projection, away from the window point, so the tolerance widens into a cone.
+    """
+    point = self.viewport_to_world(x, y)[:3]
+    if self.projection_type.get() != 1: return point, self.normal.copy(), tolerance / self.zoom, 0.0
+    # Points on the line through the center of projection and the window point all project onto it. Those in front of the center have w > 0
+    direction = self.focus - point
+    if self.view_projection[3, :3] @ direction < 0: direction = -direction
+    # By similar triangles, an offset at parameter t is seen t times smaller on the window
+    return self.focus.copy(), direction, 0.0, tolerance / self.zoom
+
   def click_in_window(self, x: float, y: float) -> bool:
     xmin, ymin, xmax, ymax = self.get_corners()
     return xmin <= x <= xmax and ymin <= y <= ymax
@@ -1,17 +1,21 @@
 from dataclasses import dataclass, field
 from enum import Enum
+from functools import lru_cache
 
 import numpy as np
 import math
 from tkinter import Canvas
 
 from my_types import WorldPoint, WindowPoint
+from window import homogeneous_divide, clip_segments_near, clip_polygon_near, clip_polyline_near
 
 class WindowObject:
   '''Representa a projeção de um objeto do mundo no plano da janela.
   Cada objeto do mundo pode ser representado por um ou vários WindowObjects.
   Cada WindowObject se desenha no canvas a partir de seu(s) ponto(s) (x, y) na janela.
   '''
+  inside: bool = False  # Já se sabe que está inteiramente dentro da região de recorte, então não precisa ser recortado
+
   def draw(self, canva: Canvas, color: str | None, thickness: int, line_color: str = None) -> None: pass
 
 @dataclass
@@ -27,10 +31,27 @@ class WindowLineObject(WindowObject):
   '''Linha na janela, definida por dois pontos.'''
   start: WindowPoint
   end: WindowPoint
+  inside: bool = False
 
   def draw(self, canva: Canvas, color: str="black", thickness: int=1, line_color: str | None = None) -> None:
     canva.create_line(self.start.x, self.start.y, self.end.x, self.end.y, fill=color, width=thickness)
 
+@dataclass
+class WindowPolylineObject(WindowObject):
+  '''Linha poligonal na janela, definida por um ou mais trechos de pontos consecutivos.
+
+  Cada trecho é desenhado com uma única linha no canvas, em vez de uma linha por segmento.
+  '''
+  runs: list[list[WindowPoint]]
+  inside: bool = False
+
+  def draw(self, canva: Canvas, color: str="black", thickness: int=1, line_color: str | None = None) -> None:
+    for run in self.runs:
+      if len(run) < 2: continue
+      coords = []
+      for p in run: coords.extend([p.x, p.y])
+      canva.create_line(*coords, fill=color, width=thickness)
+
 @dataclass
 class WindowPolygonObject(WindowObject):
   '''Polígono na janela, definido por uma lista de pontos para os vértices.
@@ -100,6 +121,20 @@ class CurveType(Enum):
     elif self == CurveType.B_SPLINE: return "B-Spline"
     return "Unknown"
 
+class CurveTessellation(Enum):
+  '''Modos de geração dos pontos de uma curva.
+
+  - Uniforme: Cada segmento é dividido em *curve_coefficient* passos iguais, independentemente de sua forma.
+  - Adaptativa: Cada segmento é subdividido apenas até ficar plano dentro de uma tolerância na tela, então trechos retos recebem poucos pontos e curvas fechadas recebem muitos.
+  '''
+  UNIFORM = 0
+  ADAPTIVE = 1
+
+  def __str__(self) -> str:
+    if self == CurveTessellation.UNIFORM: return "Uniforme"
+    elif self == CurveTessellation.ADAPTIVE: return "Adaptativa"
+    return "Unknown"
+
 @dataclass
 class Curve:
   '''Armazena informações de uma curva necessárias para construir sua representação na janela.
@@ -114,6 +149,8 @@ class Curve:
   start: float = 0.0
   end: float = 1.0
   degree: int = 4
+  # Last tessellation as (key, points, line segments), see tessellate
+  _tessellation: tuple[tuple, np.ndarray, np.ndarray] | None = field(default=None, init=False, repr=False, compare=False)
 
   @staticmethod
   def bezier_algorithm(t, *points: WindowPoint) -> WindowPoint:
@@ -125,26 +162,62 @@ class Curve:
     tv = np.array([(1-t)**(n-1-i) * t**i * math.comb(n-1, i) for i in range(n)], dtype=float)
     return WindowPoint(*(np.dot(tv, np.array(points))[:2]))
 
-  def generate_bezier_points(self, control_points: list[WindowPoint], curve_coefficient: int) -> list[WindowPoint]:
-    '''Utiliza *bezier_algorithm* para criar a lista de pontos que formam a curva de Bézier.'''
-    curve_points = []
-    for points in zip(*(control_points[i::self.degree-1] for i in range(self.degree))):
-      curve_segment = [self.bezier_algorithm(step / curve_coefficient, *points) for step in range(curve_coefficient + 1)]
+  @staticmethod
+  @lru_cache(maxsize=None)
+  def bernstein_basis(n: int, steps: int) -> np.ndarray:
+    '''Matriz (steps+1, n) com os pesos de Bernstein dos n pontos de controle de um segmento de Bézier, em t = 0, 1/steps, ..., 1.
+
+    Multiplicá-la pelos pontos de controle de um segmento gera todos os seus pontos de uma vez. É calculada uma única vez por par (n, steps).
+    '''
+    t = (np.arange(steps + 1) / steps)[:, None]
+    i = np.arange(n)
+    basis = (1-t)**(n-1-i) * t**i * np.array([math.comb(n-1, k) for k in range(n)], dtype=float)
+    basis.flags.writeable = False
+    return basis
+
+  @staticmethod
+  def points_array(points: list[WindowPoint] | np.ndarray) -> np.ndarray:
+    '''Converte uma lista de WindowPoints em um array (N, 2). Arrays são mantidos como estão.'''
+    if isinstance(points, np.ndarray): return points.astype(float, copy=False)
+    return np.array([(p.x, p.y) for p in points], dtype=float).reshape(-1, 2)
+
+  def generate_bezier_points(self, control_points: list[WindowPoint] | np.ndarray, curve_coefficient: int) -> np.ndarray:
+    '''Cria o array (M, 2) de pontos que formam a curva de Bézier, avaliando todos os segmentos com uma única multiplicação pela base de Bernstein.
+
+    Segmentos consecutivos compartilham um ponto de controle, e o ponto repetido na junção aparece uma só vez.
+    '''
+    segments = self.bezier_segments(self.points_array(control_points))
+    if len(segments) == 0: return np.empty((0, segments.shape[2]))
+    curve_points = self.bernstein_basis(self.degree, curve_coefficient) @ segments
+    # Avoid duplicating points at segment joins
+    return np.concatenate((curve_points[0], curve_points[1:, 1:].reshape(-1, segments.shape[2])))
 
-      # Avoid duplicating points at segment joins
-      if curve_points:
-        curve_segment = curve_segment[1:]
+  def bezier_segments(self, control_points: np.ndarray) -> np.ndarray:
+    '''Agrupa os pontos de controle (N, d) em segmentos de Bézier de *degree* pontos, um array (segmentos, degree, d). Segmentos consecutivos compartilham um ponto.'''
+    indices = self.segment_indices(len(control_points))
+    return control_points[indices].reshape(*indices.shape, control_points.shape[1])
 
-      curve_points.extend(curve_segment)
-    self.points = curve_points
-    return curve_points
+  def segment_indices(self, count: int) -> np.ndarray:
+    '''Índices (segmentos, k) dos pontos de controle de cada segmento da curva, para *count* pontos de controle.
+
+    Cada segmento de Bézier usa *degree* pontos, compartilhando o primeiro com o segmento anterior. Cada segmento da B-Spline usa uma janela de 4 pontos consecutivos.
+    '''
+    if self.curve_type == CurveType.B_SPLINE:
+      return np.arange(max(count - 3, 0))[:, None] + np.arange(4)
+    n = self.degree
+    # 0..n-1, n-1..2n-2, ...
+    return np.arange(max((count - 1) // (n - 1), 0))[:, None] * (n - 1) + np.arange(n)
 
-  def generate_b_spline_points(self, control_points: list[WindowPoint], curve_coefficient: int) -> list[WindowPoint]:
-    '''Gera pontos em uma curva B-Spline definida pelos pontos de controle usando o método de diferenças progressivas.'''
+  def generate_b_spline_points(self, control_points: list[WindowPoint] | np.ndarray, curve_coefficient: int) -> np.ndarray:
+    '''Gera o array (M, 2) de pontos em uma curva B-Spline definida pelos pontos de controle usando o método de diferenças progressivas.
+
+    Todos os segmentos avançam juntos: os coeficientes de cada janela de 4 pontos de controle são calculados de uma vez, e cada passo das diferenças progressivas atualiza todos os segmentos.
+    Cada segmento contribui com curve_coefficient + 1 pontos, incluindo as junções.
+    '''
+    control_points = self.points_array(control_points)
     if len(control_points) < 4:
       raise ValueError("Cubic B-Spline curve requires at least 4 control points.")
 
-    curve_points = []
     h = 1 / curve_coefficient
 
     M = np.array([
@@ -154,68 +227,156 @@ class Curve:
       [ 1/6,  4/6,  1/6, 0]
     ])
 
-    for i in range(0, len(control_points) - 3):
-      P0, P1, P2, P3 = control_points[i:i+4]
-      Gx = np.array([P0.x, P1.x, P2.x, P3.x])
-      Gy = np.array([P0.y, P1.y, P2.y, P3.y])
-      # Gz = np.array([P0[2], P1[2], P2[2], P3[2]])
-
-      # Coeficientes da curva
-      Cx = M @ Gx
-      Cy = M @ Gy
-      # Cz = M @ Gz
-
-      # Valores iniciais
-      x = Cx[3]
-      y = Cy[3]
-      # z = Cz[3]
-
-      # Primeiras diferenças
-      dx = Cx[2] * h + Cx[1] * h**2 + Cx[0] * h**3
-      dy = Cy[2] * h + Cy[1] * h**2 + Cy[0] * h**3
-      # dz = Cz[2] * h + Cz[1] * h**2 + Cz[0] * h**3
-      # Segundas diferenças
-      d2x = 2 * Cx[1] * h**2 + 6 * Cx[0] * h**3
-      d2y = 2 * Cy[1] * h**2 + 6 * Cy[0] * h**3
-      # d2z = 2 * Cz[1] * h**2 + 6 * Cz[0] * h**3
-      # Terceiras diferenças
-      d3x = 6 * Cx[0] * h**3
-      d3y = 6 * Cy[0] * h**3
-      # d3z = 6 * Cz[0] * h**3
-
-      for _ in range(curve_coefficient + 1):
-        new_point = WindowPoint(x, y)
-        curve_points.append(new_point)
-
-        x += dx
-        dx += d2x
-        d2x += d3x
-
-        y += dy
-        dy += d2y
-        d2y += d3y
-
-        # z += dz
-        # dz += d2z
-        # d2z += d3z
-
-    self.points = curve_points
-    return curve_points
-
-  def get_lines(self, control_points: list[WindowPoint], curve_coefficient: int) -> list[tuple[WindowPoint, WindowPoint]]:
-    '''Gera uma lista de pontos sobre a curva a partir do algoritmo definido por *curve_type*.
-
-    Então, constrói pares de pontos consecutivos para formar as linhas que representam a curva.
-    ''' 
+    # Coeficientes da curva: M vezes o vetor geometria de cada janela de 4 pontos, para cada coordenada. C tem forma (dimensões, segmentos, 4)
+    windows = np.arange(len(control_points) - 3)[:, None] + np.arange(4)
+    G = np.ascontiguousarray(control_points[windows].transpose(2, 0, 1))
+    C = (M @ G[..., None])[..., 0]
+
+    # Valores iniciais
+    point = C[..., 3].copy()
+    # Primeiras, segundas e terceiras diferenças
+    d1 = C[..., 2] * h + C[..., 1] * h**2 + C[..., 0] * h**3
+    d2 = 2 * C[..., 1] * h**2 + 6 * C[..., 0] * h**3
+    d3 = 6 * C[..., 0] * h**3
+
+    curve_points = np.empty((curve_coefficient + 1, *point.shape))
+    for step in range(curve_coefficient + 1):
+      curve_points[step] = point
+      point += d1
+      d1 += d2
+      d2 += d3
+
+    # (passos, dimensões, segmentos) -> (segmentos * passos, dimensões)
+    return curve_points.transpose(2, 0, 1).reshape(-1, control_points.shape[1])
+
+  def b_spline_bezier_segments(self, control_points: np.ndarray) -> np.ndarray:
+    '''Converte cada segmento da B-Spline cúbica uniforme em um segmento de Bézier cúbico equivalente, um array (segmentos, 4, d).
+
+    É o mesmo que inserir nós na B-Spline até que cada nó tenha multiplicidade 3 (algoritmo de Boehm), o que, para nós uniformes, se reduz a uma matriz fixa aplicada a cada janela de 4 pontos.
+    '''
+    if len(control_points) < 4:
+      raise ValueError("Cubic B-Spline curve requires at least 4 control points.")
+    K = np.array([
+      [1, 4, 1, 0],
+      [0, 4, 2, 0],
+      [0, 2, 4, 0],
+      [0, 1, 4, 1]
+    ]) / 6
+    return K @ control_points[self.segment_indices(len(control_points))]
+
+  @staticmethod
+  def subdivide_bezier(segments: np.ndarray, tolerance: float, max_depth: int = 16) -> tuple[np.ndarray, np.ndarray]:
+    '''Gera os pontos de uma sequência de segmentos de Bézier (segmentos, n, d), dividindo-os ao meio pelo algoritmo de de Casteljau até que cada pedaço esteja plano.
+
+    Um pedaço está plano quando todos os seus pontos de controle estão a no máximo *tolerance* da corda entre o primeiro e o último. Pela propriedade do fecho convexo, o mesmo vale para a curva.
+    Todos os pedaços de um mesmo nível de subdivisão são testados e divididos juntos. Cada pedaço gera apenas seu primeiro ponto, e o último ponto da curva fecha a sequência.
+    Retorna os pontos (M, d) e, para cada uma das M - 1 linhas entre eles, o índice do segmento de onde ela veio.
+    '''
+    if len(segments) == 0: return np.empty((0, segments.shape[2])), np.empty(0, dtype=int)
+    pending = segments
+    # Each piece is identified by the parameter where it starts, counting whole segments, so the final order is recovered by sorting
+    start = np.arange(len(segments), dtype=float)
+    size = 1.0
+    done_starts, done_points = [], []
+    for depth in range(max_depth + 1):
+      chord = pending[:, -1] - pending[:, 0]
+      inner = pending[:, 1:-1] - pending[:, :1]
+      length2 = (chord * chord).sum(axis=1)
+      with np.errstate(divide='ignore', invalid='ignore'):
+        u = np.where(length2[:, None] > 0, (inner @ chord[:, :, None])[..., 0] / length2[:, None], 0.0)
+      distance = np.linalg.norm(inner - np.clip(u, 0, 1)[..., None] * chord[:, None], axis=2)
+      flat = (distance <= tolerance).all(axis=1) if depth < max_depth else np.ones(len(pending), dtype=bool)
+      done_starts.append(start[flat])
+      done_points.append(pending[flat, 0])
+      if flat.all(): break
+
+      # de Casteljau at t = 1/2: the left half takes the first point of each level, the right half the last one
+      pending, start = pending[~flat], start[~flat]
+      left, right = [pending[:, 0]], [pending[:, -1]]
+      level = pending
+      while level.shape[1] > 1:
+        level = (level[:, :-1] + level[:, 1:]) / 2
+        left.append(level[:, 0])
+        right.append(level[:, -1])
+      size /= 2
+      pending = np.concatenate((np.stack(left, axis=1), np.stack(right[::-1], axis=1)))
+      start = np.concatenate((start, start + size))
+
+    starts = np.concatenate(done_starts)
+    order = np.argsort(starts, kind='stable')
+    return np.concatenate((np.concatenate(done_points)[order], segments[-1, -1:])), np.floor(starts[order]).astype(int)
+
+  def generate_adaptive_points(self, control_points: list[WindowPoint] | np.ndarray, tolerance: float) -> tuple[np.ndarray, np.ndarray]:
+    '''Gera o array de pontos sobre a curva subdividindo-a até a tolerância de planicidade *tolerance*, de acordo com *curve_type*, e o segmento de cada linha entre eles (ver subdivide_bezier).'''
+    control_points = self.points_array(control_points)
+    match self.curve_type:
+      case CurveType.BEZIER: return self.subdivide_bezier(self.bezier_segments(control_points), tolerance)
+      case CurveType.B_SPLINE: return self.subdivide_bezier(self.b_spline_bezier_segments(control_points), tolerance)
+      case _: return np.empty((0, control_points.shape[1])), np.empty(0, dtype=int)
+
+  def generate_points(self, control_points: list[WindowPoint] | np.ndarray, curve_coefficient: int) -> np.ndarray:
+    '''Gera o array de pontos sobre a curva a partir do algoritmo definido por *curve_type*.'''
     match self.curve_type:
-      case CurveType.BEZIER: points = self.generate_bezier_points(control_points, curve_coefficient)
-      case CurveType.B_SPLINE: points = self.generate_b_spline_points(control_points, curve_coefficient)
-      case _: points = []
-    return [(points[i], points[i+1]) for i in range(len(points)-1)]
+      case CurveType.BEZIER: return self.generate_bezier_points(control_points, curve_coefficient)
+      case CurveType.B_SPLINE: return self.generate_b_spline_points(control_points, curve_coefficient)
+      case _: return np.empty((0, self.points_array(control_points).shape[1]))
 
-  def window_objects(self, control_points: list[WindowPoint], curve_coefficient: int) -> list[WindowLineObject]:
-    '''Gera os objetos de linha que representam a curva na janela.'''
-    return [WindowLineObject(line[0], line[1]) for line in self.get_lines(control_points, curve_coefficient)]
+  def tessellate(self, control_points: np.ndarray, curve_coefficient: int, tolerance: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+    '''Gera o array (M, 4) de pontos homogêneos da curva no espaço do objeto, a partir de seus pontos de controle (N, 4) antes da matriz de modelo.
+    Também retorna, para cada uma das M - 1 linhas entre pontos consecutivos, o índice do segmento da curva de onde ela veio (ver segment_indices).
+
+    Sem *tolerance*, cada segmento é dividido em *curve_coefficient* passos. Com ela, a curva é subdividida de forma adaptativa até essa tolerância de planicidade (ver CurveTessellation).
+    Curvas de Bézier e B-Splines são invariantes a transformações afins, então transformar os pontos gerados equivale a gerar a curva a partir dos pontos transformados.
+    Por isso o resultado é guardado e reaproveitado enquanto os pontos de controle, o tipo, o grau, *curve_coefficient* e *tolerance* não mudarem, mesmo que a câmera ou a matriz de modelo mudem.
+    '''
+    key = (self.curve_type, self.degree, curve_coefficient, tolerance, control_points.tobytes())
+    if self._tessellation is None or self._tessellation[0] != key:
+      if tolerance is None:
+        points = self.generate_points(control_points[:, :3], curve_coefficient)
+        # Every segment has the same number of lines. B-Splines repeat the point at each join, adding one more line per segment
+        lines_per_segment = curve_coefficient + 1 if self.curve_type == CurveType.B_SPLINE else curve_coefficient
+        line_segments = np.arange(max(len(points) - 1, 0)) // lines_per_segment
+      else: points, line_segments = self.generate_adaptive_points(control_points[:, :3], tolerance)
+      self._tessellation = (key, np.column_stack((points, np.ones(len(points)))), line_segments)
+    return self._tessellation[1], self._tessellation[2]
+
+  def hull_classes(self, clip_control_points: np.ndarray, near: float, region: tuple[float, float, float, float] | None) -> tuple[np.ndarray, np.ndarray]:
+    '''Classifica cada segmento da curva em relação à região de recorte (xmin, ymin, xmax, ymax) da janela, a partir de seus pontos de controle já projetados em coordenadas homogêneas (N, 4).
+
+    Cada segmento está contido no fecho convexo de seus pontos de controle, e a projeção leva esse fecho ao fecho convexo dos pontos projetados enquanto todos estiverem à frente do plano w = *near*.
+    Então, se a caixa envolvente dos pontos de controle projetados de um segmento está inteiramente fora da região, o segmento também está, e se está inteiramente dentro, o segmento não precisa ser recortado.
+    Retorna as máscaras dos segmentos inteiramente fora e inteiramente dentro. Segmentos com algum ponto de controle atrás do plano só são descartados se todos estiverem.
+    '''
+    indices = self.segment_indices(len(clip_control_points))
+    hull = clip_control_points[indices]
+    behind = hull[..., 3] < near
+    outside = behind.all(axis=1)
+    inside = np.zeros(len(indices), dtype=bool)
+    if region is None or len(indices) == 0: return outside, inside
+
+    in_front = ~behind.any(axis=1)
+    points = homogeneous_divide(hull.reshape(-1, 4)).reshape(*indices.shape, 2)
+    box_min, box_max = points.min(axis=1), points.max(axis=1)
+    region_min, region_max = np.array(region[:2]), np.array(region[2:])
+    outside |= in_front & ((box_max < region_min) | (box_min > region_max)).any(axis=1)
+    inside = in_front & (box_min >= region_min).all(axis=1) & (box_max <= region_max).all(axis=1)
+    return outside, inside
+
+  def window_objects(self, clip_points: np.ndarray, near: float, visible: np.ndarray | None = None, inside: np.ndarray | None = None) -> list[WindowPolylineObject]:
+    '''Gera a linha poligonal que representa a curva na janela, a partir de seus pontos gerados já projetados em coordenadas homogêneas (M, 4).
+
+    As máscaras *visible* e *inside*, uma entrada por linha entre pontos consecutivos, indicam quais linhas desenhar e quais já se sabe estarem dentro da região de recorte (ver hull_classes).
+    Cada trecho de linhas visíveis consecutivas é recortado contra o plano w = *near* antes da divisão por w, e vira um ou mais trechos da linha poligonal.
+    '''
+    if visible is None: visible = np.ones(max(len(clip_points) - 1, 0), dtype=bool)
+    # Linhas [begin, end) de cada trecho de linhas visíveis consecutivas
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], visible.astype(int), [0])))).tolist()
+    runs = []
+    for begin, end in zip(edges[::2], edges[1::2]):
+      for run in clip_polyline_near(clip_points[begin:end + 1], near):
+        runs.append([WindowPoint(x, y) for x, y in homogeneous_divide(run).tolist()])
+    if not runs: return []
+    return [WindowPolylineObject(runs, inside=inside is not None and bool(inside[visible].all()))]
 
   def __str__(self) -> str:
     output = f"ctype {self.curve_type.obj_name()}\n"
@@ -297,30 +458,31 @@ class Surface:
   end_u: float = 1.0
   start_v: float = 0.0
   end_v: float = 1.0
+  # Last tessellation as (key, grid), see tessellate
+  _mesh: tuple[tuple, np.ndarray] | None = field(default=None, init=False, repr=False, compare=False)
 
-  def window_objects(self, control_points: list[WindowPoint]) -> list[WindowObject]:
-    '''Gera os objetos de linha que representam a superfície na janela.'''
-    return [WindowLineObject(line[0], line[1]) for line in self.get_surface_points(control_points)]
+  def tessellate(self, control_points: np.ndarray) -> np.ndarray:
+    '''Gera a grade (linhas, colunas, 4) de pontos homogêneos da superfície no espaço do objeto, a partir de seus pontos de controle (N, 4) antes da matriz de modelo.
 
-  def get_surface_points(self, control_points: list[WindowPoint]) -> list[tuple[WindowPoint, WindowPoint]]:
-    '''Gera uma lista de pontos sobre a superfície a partir do algoritmo definido por *surface_type*.
-
-    Então, constrói pares de pontos consecutivos para formar as linhas que representam a superfície.
+    Assim como nas curvas (ver Curve.tessellate), a grade é invariante a transformações afins, então basta projetá-la com a matriz de modelo a cada quadro.
+    Ela é guardada e só é gerada novamente quando os pontos de controle, o tipo, o algoritmo, *degrees* ou *surface_steps* mudam.
     '''
-    points: list[list[WindowPoint]] = self.generate_surface_points(control_points)
-    lines = []
-
-    rows = len(points)
-    cols = len(points[0]) if rows > 0 else 0
+    key = (self.surface_type, self.surface_algorithm_type, self.degrees, self.surface_steps, control_points.tobytes())
+    if self._mesh is None or self._mesh[0] != key:
+      points = self.generate_surface_points(control_points[:, :3])
+      self._mesh = (key, np.concatenate((points, np.ones((*points.shape[:2], 1))), axis=2))
+    return self._mesh[1]
 
-    for i in range(rows):
-        for j in range(cols - 1):
-            lines.append((points[i][j], points[i][j + 1]))
-    for j in range(cols):
-        for i in range(rows - 1):
-            lines.append((points[i][j], points[i + 1][j]))
+  def window_objects(self, clip_points: np.ndarray, near: float) -> list[WindowPolylineObject]:
+    '''Gera as isolinhas que representam a superfície na janela, a partir de sua grade de pontos já projetada em coordenadas homogêneas (linhas, colunas, 4).
 
-    return lines
+    Cada linha e cada coluna da grade vira uma única linha poligonal, primeiro as linhas, depois as colunas. São recortadas contra o plano w = *near* antes da divisão por w.
+    '''
+    objects = []
+    for isoline in (*clip_points, *clip_points.transpose(1, 0, 2)):
+      runs = [[WindowPoint(x, y) for x, y in homogeneous_divide(run).tolist()] for run in clip_polyline_near(isoline, near)]
+      if runs: objects.append(WindowPolylineObject(runs))
+    return objects
   
   def get_matrices(self) -> np.array:
     if self.surface_type == SurfaceType.BEZIER:
@@ -342,8 +504,11 @@ class Surface:
 
     return M_b_matrix
 
-  def generate_surface_points(self, control_points: list[WindowPoint]) -> list[list[WindowPoint]]:
-    self.control_points = control_points
+  def generate_surface_points(self, control_points: list[WindowPoint] | np.ndarray) -> np.ndarray:
+    '''Gera a grade (linhas, colunas, d) de pontos sobre a superfície, a partir de seus pontos de controle (N, d), com o algoritmo definido por *surface_algorithm_type*.
+
+    Os retalhos (patches) são empilhados ao longo das linhas, cada um com surface_steps + 1 linhas e colunas.
+    '''
     if self.surface_algorithm_type == SurfaceAlgorithmType.FORWARD_DIFFERENCES:
       return self.generate_forward_differences_surface_points(control_points)
     elif self.surface_algorithm_type == SurfaceAlgorithmType.BLENDING_FUNCTIONS:
@@ -351,48 +516,48 @@ class Surface:
     else:
       raise ValueError("Unsupported surface algorithm type.")
   
-  def generate_forward_differences_surface_points(self, control_points: list[WindowPoint]) -> list[list[WindowPoint]]:
+  def generate_forward_differences_surface_points(self, control_points: list[WindowPoint] | np.ndarray) -> np.ndarray:
+    '''Gera a grade de pontos da superfície pelo método de diferenças progressivas, avançando todos os retalhos juntos.
+
+    As matrizes de diferenças D·C·Dᵀ de todos os retalhos e coordenadas são empilhadas. O primeiro laço avança as diferenças em v e guarda, a cada passo, as diferenças iniciais em u.
+    O segundo laço avança todas essas diferenças em u de uma só vez, gerando uma coluna da grade de todos os retalhos a cada passo.
+    '''
     step_size = 1 / self.surface_steps
+    steps = self.surface_steps + 1
     num_points_per_patch = 4
-    
+
     M_b_matrix = self.get_matrices()
     M_b_matrix_T = M_b_matrix.T
     num_points_x, num_points_y = self.degrees[0], self.degrees[1]
-    
+
     if len(control_points) != num_points_x * num_points_y:
       raise ValueError("Number of control points does not match the specified degrees. Expected {}, got {}.".format(num_points_x * num_points_y, len(control_points)))
-    
-    G_all_xy = np.array([[cp.x, cp.y] for cp in control_points]).reshape(num_points_x, num_points_y, 2)
-    GX_all = G_all_xy[:, :, 0]
-    GY_all = G_all_xy[:, :, 1]
-    
-    surface_points: list[list[WindowPoint]] = []
-    if self.surface_type == SurfaceType.B_SPLINE:
-      num_points_x = self.degrees[0]
-      num_points_y = self.degrees[1]
 
+    G_all = Curve.points_array(control_points).reshape(num_points_x, num_points_y, -1)
+
+    if self.surface_type == SurfaceType.B_SPLINE:
       if num_points_x < 4 or num_points_y < 4:
         raise ValueError("B-Spline cúbica requer no mínimo 4 pontos (grau 3) em ambas as direções.")
-        
+
       num_patches_u = num_points_x - 3
       num_patches_v = num_points_y - 3
       patch_step = 1
-      
+
     elif self.surface_type == SurfaceType.BEZIER:
       if num_points_x < 4 or num_points_y < 4:
         raise ValueError("Bézier cúbica requer no mínimo 4 pontos (grau 3) em ambas as direções.")
-      
-      num_patches_u = num_points_x // 4 
+
+      num_patches_u = num_points_x // 4
       num_patches_v = num_points_y // 4
       patch_step = 4
     else:
-      raise ValueError("Unsupported surface type.") 
-      
+      raise ValueError("Unsupported surface type.")
+
     # defining differences matrices
     delta = step_size
     delta2 = delta * delta
     delta3 = delta2 * delta
-    
+
     D = np.array([
       [0,         0,          0,      1],  # P(0)
       [delta3,    delta2,     delta,  0],  # Delta P(0)
@@ -400,124 +565,84 @@ class Surface:
       [6*delta3,  0,          0,      0]   # Delta^3 P(0)
     ])
 
-    # Loop principal pelos patches
-    for patch_u_idx in range(num_patches_u):
-      for patch_v_idx in range(num_patches_v):
-        start_u = patch_u_idx * patch_step
-        start_v = patch_v_idx * patch_step
-        end_u = start_u + num_points_per_patch
-        end_v = start_v + num_points_per_patch
-        
-        GX = GX_all[start_u:end_u, start_v:end_v]
-        GY = GY_all[start_u:end_u, start_v:end_v]
-
-        CX = np.matmul(M_b_matrix, np.matmul(GX, M_b_matrix_T))
-        CY = np.matmul(M_b_matrix, np.matmul(GY, M_b_matrix_T))
-        
-
-        FX = np.matmul(D, np.matmul(CX, D.T))
-        FY = np.matmul(D, np.matmul(CY, D.T))
+    # Geometrias de todos os retalhos, em ordem u, depois v: (d, retalhos, 4, 4)
+    rows_u = np.arange(num_patches_u)[:, None] * patch_step + np.arange(num_points_per_patch)
+    cols_v = np.arange(num_patches_v)[:, None] * patch_step + np.arange(num_points_per_patch)
+    G = G_all[rows_u[:, None, :, None], cols_v[None, :, None, :]].reshape(-1, num_points_per_patch, num_points_per_patch, G_all.shape[2])
+    G = np.ascontiguousarray(G.transpose(3, 0, 1, 2))
+
+    C = np.matmul(M_b_matrix, np.matmul(G, M_b_matrix_T))
+    F_V = np.matmul(D, np.matmul(C, D.T))
+
+    # Diferenças iniciais em u de cada linha da grade: (linhas, d, retalhos, 4)
+    f = np.empty((steps, *F_V.shape[:3]))
+    for i in range(steps):
+      f[i] = F_V[..., 0]
+      if i < self.surface_steps:
+        F_V[..., 0] += F_V[..., 1]
+        F_V[..., 1] += F_V[..., 2]
+        F_V[..., 2] += F_V[..., 3]
+
+    # (colunas, linhas, d, retalhos)
+    surface_points = np.empty((steps, *f.shape[:3]))
+    for j in range(steps):
+      surface_points[j] = f[..., 0]
+      f[..., 0] += f[..., 1]
+      f[..., 1] += f[..., 2]
+      f[..., 2] += f[..., 3]
+
+    # (retalhos, linhas, colunas, d), com as linhas de cada retalho empilhadas
+    return surface_points.transpose(3, 1, 0, 2).reshape(-1, steps, G_all.shape[2])
 
-        F_VX = FX.copy() 
-        F_VY = FY.copy()
-        patch_points: list[list[WindowPoint]] = []
-        
-        for i in range(self.surface_steps + 1):
-          f_x = F_VX[:, 0].copy()
-          f_y = F_VY[:, 0].copy()
-          row_points = []
-          
-          for j in range(self.surface_steps + 1):
-            x = f_x[0]
-            y = f_y[0]
-            row_points.append(WindowPoint(x, y))
-
-            f_x[0] += f_x[1]
-            f_x[1] += f_x[2]
-            f_x[2] += f_x[3]
-            f_y[0] += f_y[1]
-            f_y[1] += f_y[2]
-            f_y[2] += f_y[3]
-            
-          patch_points.append(row_points)
-          
-          if i < self.surface_steps:
-            F_VX[:, 0] += F_VX[:, 1]
-            F_VX[:, 1] += F_VX[:, 2]
-            F_VX[:, 2] += F_VX[:, 3]
-            F_VY[:, 0] += F_VY[:, 1]
-            F_VY[:, 1] += F_VY[:, 2]
-            F_VY[:, 2] += F_VY[:, 3]
-            
-        surface_points.extend(patch_points)
-    return surface_points
-
-  def generate_blending_functions_surface_points(self, control_points: list[WindowPoint]) -> list[list[WindowPoint]]:    
-    step_size = 1 / self.surface_steps
-    num_points_per_patch = 4
-    
+  @staticmethod
+  @lru_cache(maxsize=None)
+  def power_basis(steps: int) -> np.ndarray:
+    '''Matriz (steps+1, 4) com as linhas [t³, t², t, 1] para t = 0, 1/steps, ..., 1. É calculada uma única vez por valor de *steps*.'''
+    t = np.arange(steps + 1) / steps
+    basis = np.column_stack((t**3, t**2, t, np.ones_like(t)))
+    basis.flags.writeable = False
+    return basis
+
+  def generate_blending_functions_surface_points(self, control_points: list[WindowPoint] | np.ndarray) -> np.ndarray:
+    '''Avalia todos os retalhos da superfície de uma só vez como U·M·G·Mᵀ·Uᵀ, com a base de potências U de power_basis e a matriz de base M de get_matrices.
+
+    G empilha as geometrias 4x4 de todos os retalhos, e cada coordenada é avaliada junto com as demais em um único einsum.
+    '''
     M_b_matrix = self.get_matrices()
-    M_b_matrix_T = M_b_matrix.T
     num_points_x, num_points_y = self.degrees[0], self.degrees[1]
-    
+
     if len(control_points) != num_points_x * num_points_y:
       raise ValueError("Number of control points does not match the specified degrees. Expected {}, got {}.".format(num_points_x * num_points_y, len(control_points)))
 
-    G_all_xy = np.array([[cp.x, cp.y] for cp in control_points]).reshape(num_points_x, num_points_y, 2)
-    GX_all = G_all_xy[:, :, 0]
-    GY_all = G_all_xy[:, :, 1]
-    
-    surface_points: list[list[WindowPoint]] = []
-    
+    G_all = Curve.points_array(control_points).reshape(num_points_x, num_points_y, -1)
+
     if self.surface_type == SurfaceType.B_SPLINE:
       if num_points_x < 4 or num_points_y < 4:
         raise ValueError("B-Spline surface requires at least degree 3 in both u and v directions.")
-      
+
       num_patches_u = num_points_x - 3
       num_patches_v = num_points_y - 3
       patch_step = 1
-      
+
     elif self.surface_type == SurfaceType.BEZIER:
       if num_points_x % 4 != 0 or num_points_y % 4 != 0:
         raise ValueError("Bézier surface requires degrees to be multiples of 3 plus 1.")
-      
-      num_patches_u = num_points_x // 4 
+
+      num_patches_u = num_points_x // 4
       num_patches_v = num_points_y // 4
       patch_step = 4
-      
-      
-    for patch_u_idx in range(num_patches_u):
-      for patch_v_idx in range(num_patches_v):
-        start_u = patch_u_idx * patch_step
-        start_v = patch_v_idx * patch_step
-        end_u = start_u + num_points_per_patch
-        end_v = start_v + num_points_per_patch
-        
-        GX = GX_all[start_u:end_u, start_v:end_v]
-        GY = GY_all[start_u:end_u, start_v:end_v]
-        
-        temp_X = np.matmul(M_b_matrix, GX)
-        CX = np.matmul(temp_X, M_b_matrix_T)
-        
-        temp_Y = np.matmul(M_b_matrix, GY)
-        CY = np.matmul(temp_Y, M_b_matrix_T)
-        
-        for i in range(self.surface_steps + 1):
-          row_points = []
-          u = i * step_size
-          u_vec = np.array([u**3, u**2, u, 1])
-          for j in range(self.surface_steps + 1):
-            v = j * step_size
-            v_vec = np.array([v**3, v**2, v, 1])
-            
-            x = np.matmul(np.matmul(u_vec, CX), v_vec)
-            y = np.matmul(np.matmul(u_vec, CY), v_vec)
-            
-            row_points.append(WindowPoint(x, y))
-            
-          surface_points.append(row_points)
-    return surface_points         
- 
+
+    # Índices das linhas e colunas de controle de cada retalho: (retalhos, 4)
+    rows_u = np.arange(num_patches_u)[:, None] * patch_step + np.arange(4)
+    cols_v = np.arange(num_patches_v)[:, None] * patch_step + np.arange(4)
+    # (retalhos u, retalhos v, 4, 4, d)
+    G = G_all[rows_u[:, None, :, None], cols_v[None, :, None, :]]
+
+    UM = self.power_basis(self.surface_steps) @ M_b_matrix
+    # (retalhos u, retalhos v, passos u, passos v, d), com os retalhos em ordem u, depois v
+    points = np.einsum('si,abijd,tj->abstd', UM, G, UM, optimize=True)
+    return points.reshape(-1, self.surface_steps + 1, G_all.shape[2])
+
   def copy(self) -> 'Surface':
     return Surface(
       self.surface_type,
@@ -538,6 +663,87 @@ class Surface:
     output += "parm u 0 1\nparm v 0 1"
     return output
 
+@dataclass
+class Faces:
+  '''Armazena as faces de um Wireframe no formato CSR (compressed sparse row).
+
+  Os índices dos vértices de todas as faces ficam contíguos em um único array *indices*. A face i ocupa o trecho indices[offsets[i]:offsets[i+1]].
+  *textures* guarda a cor de preenchimento de cada face, ou None para faces sem preenchimento.
+  '''
+  offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=int))
+  indices: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=int))
+  textures: list[str | None] = field(default_factory=list)
+
+  @classmethod
+  def from_list(cls, faces: list[tuple[list[int], str | None]]) -> 'Faces':
+    '''Constrói o formato CSR a partir de uma lista de pares (índices dos vértices, cor de preenchimento).'''
+    offsets = np.zeros(len(faces) + 1, dtype=int)
+    np.cumsum([len(vertices) for vertices, _ in faces], out=offsets[1:])
+    indices = np.fromiter((idx for vertices, _ in faces for idx in vertices), dtype=int, count=offsets[-1])
+    return cls(offsets, indices, [texture for _, texture in faces])
+
+  def __len__(self) -> int:
+    return len(self.textures)
+
+  def __iter__(self):
+    '''Percorre as faces como pares (índices dos vértices, cor de preenchimento).'''
+    for i, texture in enumerate(self.textures):
+      yield self.indices[self.offsets[i]:self.offsets[i+1]], texture
+
+  def copy(self) -> 'Faces':
+    return Faces(self.offsets.copy(), self.indices.copy(), self.textures[:])
+
+@dataclass
+class Bounds:
+  '''Volumes envolventes de um conjunto de pontos: centroide, caixa alinhada aos eixos (AABB) e esfera envolvente.
+
+  Permitem que ordenação, recorte e seleção de objetos trabalhem sem percorrer seus vértices.
+  '''
+  centroid: WorldPoint  # Homogeneous (x, y, z, 1)
+  box_min: np.ndarray
+  box_max: np.ndarray
+  sphere_center: np.ndarray
+  radius: float
+
+  @classmethod
+  def from_points(cls, points: np.ndarray) -> 'Bounds':
+    '''Calcula os volumes envolventes de um array (N, 4) de pontos.'''
+    if len(points) == 0: return cls(np.array([0, 0, 0, 1.0]), np.zeros(3), np.zeros(3), np.zeros(3), 0.0)
+    box_min = points[:, :3].min(axis=0)
+    box_max = points[:, :3].max(axis=0)
+    sphere_center = (box_min + box_max) / 2
+    radius = float(np.sqrt(((points[:, :3] - sphere_center)**2).sum(axis=1).max()))
+    return cls(points.mean(axis=0), box_min, box_max, sphere_center, radius)
+
+  def in_frustum(self, planes: np.ndarray) -> bool:
+    '''Testa a caixa contra os planos (a, b, c, d) de um volume de visualização, retornando False se ela estiver inteiramente fora de algum deles.
+
+    Para cada plano, basta testar o vértice da caixa mais adiantado na direção de sua normal.
+    '''
+    return Bounds.box_in_frustum(self.box_min, self.box_max, planes)
+
+  @staticmethod
+  def box_in_frustum(box_min: np.ndarray, box_max: np.ndarray, planes: np.ndarray) -> bool:
+    farthest = np.where(planes[:, :3] > 0, box_max, box_min)
+    return bool(np.all((farthest * planes[:, :3]).sum(axis=1) + planes[:, 3] >= 0))
+
+  def transformed(self, M: np.ndarray) -> 'Bounds':
+    '''Volumes envolventes dos mesmos pontos após a transformação afim M, calculados sem os pontos.
+
+    O centroide é exato. A caixa é a menor caixa alinhada aos eixos que contém a caixa original transformada.
+    O raio da esfera é multiplicado pela maior dilatação da parte linear de M (sua norma espectral).
+    '''
+    linear = M[:3, :3]
+    box_center = M[:3] @ np.append((self.box_min + self.box_max) / 2, 1.0)
+    half_extent = np.abs(linear) @ ((self.box_max - self.box_min) / 2)
+    return Bounds(
+      M @ self.centroid,
+      box_center - half_extent,
+      box_center + half_extent,
+      M[:3] @ np.append(self.sphere_center, 1.0),
+      self.radius * float(np.linalg.norm(linear, 2))
+    )
+
 @dataclass 
 class Wireframe:
   '''Representa um objeto 3D no mundo, composto por vértices, arestas, faces, curvas e superfícies.
@@ -548,54 +754,77 @@ class Wireframe:
   Cada vértice é um WorldPoint, que é um array de n elementos de acordo com o número de dimensões do mundo. Esses pontos podem ser projetados para a janela, que é um plano.
   Ou seja, WorldPoint (n dimensões) pode ser convertido para WindowPoint (2 dimensões).
 
+  Os vértices são armazenados juntos em um único array (N, 4), as arestas em um array (E, 2) de índices e as faces no formato CSR (ver Faces).
+  Assim, transformações e projeções operam sobre todos os vértices de uma só vez.
+
+  Rotações, translações e escalas não alteram os vértices: apenas acumulam sua matriz na matriz de modelo (*model_matrix*), em O(1).
+  Os vértices no mundo são *vertices* transformados por *model_matrix*. *world_vertices* os calcula sem alterar o objeto; a matriz só é aplicada aos vértices (*bake*) na exportação e na edição.
+  Para desenhar, a matriz de modelo é composta com a matriz de projeção da janela, sem tocar nos vértices.
+
   A representação de cada compoenente do Wireframe é:
   - Vértices: Diretamente convertidos para WindowPointObject
   - Arestas: Cada aresta é representada por um WindowLineObject, que conecta dois vértices.
   - Faces: Cada face é representada por múltiplos WindowLineObject, que conecta múltiplos vértices de forma circular. Caso a face possua textura, também será criado um WindowPolygonObject para preenchê-la.
-  - Curvas: Cada curva é representada por múltiplos WindowLineObject, criadas a partir dos pontos de controle.
-  - Superfícies: Cada superfície é representada por múltiplos WindowLineObject, criadas a partir dos pontos de controle.
+  - Curvas: Cada curva é representada por um WindowPolylineObject, criado a partir dos pontos de controle.
+  - Superfícies: Cada superfície é representada por um WindowPolylineObject para cada isolinha, criados a partir dos pontos de controle.
 
   Para desenhar o Wireframe na janela, primeiro é necessário converter seus vértices em WindowPoints. Então, cada componente pode usar esses valores para construir seus objetos de janela respectivos e desenhá-los.
   Os vértices do Wireframe só são desenhados como pontos se o Wireframe não possuir nenhum outro tipo de componente.
   '''
   wireframe_id: int
   name: str
-  vertices: list[WorldPoint] = field(default_factory=list)  # List of vertices, each vertex is a numpy array of 4 elements (x, y, z, 1)
-  projected_vertices: list[WindowPoint] = field(default_factory=list)  # List of projected vertices in window coordinates
-  edges: list[tuple[int, int]] = field(default_factory=list)  # (start vertex index, end vertex index)
-  faces: list[tuple[list[int], str | None]] = field(default_factory=list)  # (vertex indices, fill color)
+  vertices: np.ndarray = field(default_factory=lambda: np.empty((0, 4)))  # (N, 4) array, one homogeneous vertex (x, y, z, 1) per row, before model_matrix is applied
+  edges: np.ndarray = field(default_factory=lambda: np.empty((0, 2), dtype=int))  # (E, 2) array of (start vertex index, end vertex index)
+  faces: Faces = field(default_factory=Faces)  # Vertex indices and fill color of each face, in CSR layout
   curves: list[Curve] = field(default_factory=list)
   surfaces: list[Surface] = field(default_factory=list)  # Placeholder for future surface implementations
   thickness: float | None = 1.0
   texture: str | None = None
   line_color: str | None = "black"
+  version: int = 0  # Incremented whenever the geometry changes, so cached projections of the object can be discarded
+  model_matrix: np.ndarray = field(default_factory=lambda: np.eye(4))  # Transformations applied to the object but not yet baked into its vertices
+  # Bounding volumes of the vertices before and after model_matrix. The latter is recomputed from the former whenever the version changes
+  _local_bounds: Bounds | None = field(default=None, init=False, repr=False)
+  _bounds: Bounds | None = field(default=None, init=False, repr=False)
+  _bounds_version: int = field(default=-1, init=False, repr=False)
+
+  def __post_init__(self):
+    # Accept plain lists of points, edges and faces, converting them to the array layout
+    vertices = np.asarray(self.vertices, dtype=float)
+    if vertices.size == 0: vertices = np.empty((0, 4))
+    else: vertices = vertices.reshape(len(vertices), -1)
+    if vertices.shape[1] == 3: vertices = np.column_stack((vertices, np.ones(len(vertices))))
+    self.vertices = vertices
+    self.edges = np.asarray(self.edges, dtype=int).reshape(-1, 2)
+    if not isinstance(self.faces, Faces): self.faces = Faces.from_list(self.faces)
 
   def copy(self) -> 'Wireframe':
     return Wireframe(
       self.wireframe_id,
       self.name,
-      [v.copy() for v in self.vertices],
-      [v.copy() for v in self.projected_vertices],
-      [edge[:] for edge in self.edges],
-      [(face[0][:], face[1]) for face in self.faces],
+      self.vertices.copy(),
+      self.edges.copy(),
+      self.faces.copy(),
       [c.copy() for c in self.curves],
       [s.copy() for s in self.surfaces],
       self.thickness,
       self.texture,
-      self.line_color
+      self.line_color,
+      self.version,
+      self.model_matrix.copy()
     )
     
   def get_type(self) -> str:
     if self.surfaces: return "Surface"
     if self.curves: return "Curve"
-    if self.faces: return "Face"
-    if self.edges: return "Edge"
-    if self.vertices: return "Point"
+    if len(self.faces): return "Face"
+    if len(self.edges): return "Edge"
+    if len(self.vertices): return "Point"
     return "Empty"
   
   def __str__(self) -> str:
-    vertices_str = '\n'.join(f"v {' '.join(map(str, v[:-1]))}" for v in self.vertices)
-    edges_str = '\n'.join(f"l {start+1} {end+1}" for start, end in self.edges)
+    vertices_str = '\n'.join(f"v {' '.join(map(str, v[:-1]))}" for v in self.world_vertices.tolist())
+    edges_str = '\n'.join(f"l {start+1} {end+1}" for start, end in self.edges.tolist())
     faces_str = "\n".join([self.polygon_str(face) for face in self.faces])
     curves_str = "\n".join([str(curve) for curve in self.curves])
     surfaces_str = "\n".join([str(surface) for surface in self.surfaces])
@@ -609,10 +838,16 @@ class Wireframe:
     return "\n\n".join(parts) + "\n"
 
   @staticmethod
-  def polygon_str(face: tuple[list[int], str | None]) -> str:
+  def loop_edges(n: int) -> np.ndarray:
+    '''Arestas que ligam n vértices consecutivos de forma circular: (0, 1), (1, 2), ..., (n-1, 0).'''
+    indices = np.arange(n)
+    return np.column_stack((indices, np.roll(indices, -1)))
+
+  @staticmethod
+  def polygon_str(face: tuple[np.ndarray, str | None]) -> str:
     vertices, texture = face
     texture_str = f"usemtl {texture}\n" if texture else ""
-    return f"{texture_str}f {' '.join(str(idx+1) for idx in vertices)}"
+    return f"{texture_str}f {' '.join(str(idx+1) for idx in vertices.tolist())}"
 
   def distance(self, window: np.ndarray) -> float:
     """Calculate the distance from the object's center to the window's position."""
@@ -620,32 +855,61 @@ class Wireframe:
     window_pos = window[:3]
     return np.linalg.norm(center - window_pos).astype(float)
 
-  def window_objects(self, curve_coefficient: int, surface_degree: list[int] | None) -> list[WindowObject]:
-    '''Gera uma lista de objetos de janela que representam o Wireframe.
+  def window_objects(self, clip_vertices: np.ndarray, matrix: np.ndarray, curve_coefficient: int, surface_degree: list[int] | None, near: float, curve_tolerance: float | None = None, clip_region: tuple[float, float, float, float] | None = None) -> list[WindowObject]:
+    '''Gera uma lista de objetos de janela que representam o Wireframe a partir de seus vértices projetados, um array (N, 4) de coordenadas homogêneas ainda não divididas por w, na mesma ordem de *vertices*.
+    *matrix* é a matriz que levou os vértices a essas coordenadas (projeção da janela composta com a matriz de modelo), usada para projetar os pontos gerados das curvas e superfícies.
+    Com *curve_tolerance*, uma distância no mundo, as curvas são geradas de forma adaptativa em vez de em *curve_coefficient* passos.
+    Com *clip_region*, a região de recorte (xmin, ymin, xmax, ymax) da janela, segmentos de curvas cujos pontos de controle estão inteiramente fora dela são descartados antes de serem gerados, e os inteiramente dentro não são recortados.
+
+    Antes da divisão por w, arestas, faces, curvas e superfícies são recortadas contra o plano w = *near*, de forma que pontos atrás do centro de projeção nunca cheguem à janela.
 
     A definição da construção de objetos de janela a partir de cada componente está na docstring da classe Wireframe.
+    O Wireframe não é alterado, então não é necessário copiá-lo antes de desenhá-lo.
     '''
     objects: list[WindowObject] = []
-    for start_idx, end_idx in self.edges: objects.append(WindowLineObject(self.projected_vertices[start_idx], self.projected_vertices[end_idx]))
-    for face in self.faces:
-      face_vertices = [self.projected_vertices[idx] for idx in face[0]]
-      objects.append(WindowPolygonObject(face_vertices, texture=face[1]))
-    for curve in self.curves: objects.extend(curve.window_objects([self.projected_vertices[x] for x in curve.control_points], curve_coefficient))
-    for surface in self.surfaces: 
-      objects.extend(surface.window_objects([self.projected_vertices[x] for x in surface.control_points]))
+    in_front = clip_vertices[:, 3] >= near
+    projected_vertices = [WindowPoint(x, y) for x, y in homogeneous_divide(clip_vertices).tolist()]
+    if in_front.all():
+      for start_idx, end_idx in self.edges.tolist(): objects.append(WindowLineObject(projected_vertices[start_idx], projected_vertices[end_idx]))
+    else:
+      starts, ends, _ = clip_segments_near(clip_vertices[self.edges[:, 0]], clip_vertices[self.edges[:, 1]], near)
+      for start, end in zip(homogeneous_divide(starts).tolist(), homogeneous_divide(ends).tolist()): objects.append(WindowLineObject(WindowPoint(*start), WindowPoint(*end)))
+    for face_indices, texture in self.faces:
+      if in_front[face_indices].all(): face_vertices = [projected_vertices[idx] for idx in face_indices.tolist()]
+      else: face_vertices = [WindowPoint(x, y) for x, y in homogeneous_divide(clip_polygon_near(clip_vertices[face_indices], near)).tolist()]
+      # Faces com menos de 3 vértices (ou que ficaram assim após o recorte) não formam um polígono
+      if len(face_vertices) >= 3: objects.append(WindowPolygonObject(face_vertices, texture=texture))
+    for curve in self.curves:
+      outside, inside = curve.hull_classes(clip_vertices[curve.control_points], near, clip_region)
+      if outside.all(): continue
+      # Curvas são geradas no espaço do objeto, e apenas seus pontos são projetados
+      points, line_segments = curve.tessellate(self.vertices[curve.control_points], curve_coefficient, self.local_tolerance(curve_tolerance))
+      objects.extend(curve.window_objects(points @ matrix.T, near, ~outside[line_segments], inside[line_segments]))
+    for surface in self.surfaces:
+      # Assim como as curvas, superfícies são geradas no espaço do objeto, e apenas sua grade é projetada
+      objects.extend(surface.window_objects(surface.tessellate(self.vertices[surface.control_points]) @ matrix.T, near))
     if objects == []:  # If there are no edges, faces or curves, draw the vertices as points
-      for v in self.projected_vertices: objects.append(WindowPointObject(v))
+      for v, visible in zip(projected_vertices, in_front.tolist()):
+        if visible: objects.append(WindowPointObject(v))
 
     return objects
 
+  def local_tolerance(self, tolerance: float | None) -> float | None:
+    '''Converte uma distância no mundo para o espaço do objeto, antes da matriz de modelo, dividindo-a pela maior dilatação da matriz.'''
+    if tolerance is None: return None
+    return tolerance / max(float(np.linalg.norm(self.model_matrix[:3, :3], 2)), 1e-12)
+
   @classmethod
   def load_file(cls, filepath: str | None) -> list['Wireframe']:
     '''Carrega um arquivo no formato Wavefront OBJ e retorna uma lista de Wireframes.'''
     if filepath is None: return []
     objects: list[Wireframe] = []
-    current_vertices: list[WorldPoint] = []
+    # Components are accumulated in flat lists and converted to arrays once the object is complete
+    current_vertices: list[tuple[float, float, float, float]] = []
     current_edges: list[tuple[int, int]] = []
-    current_faces: list[tuple[list[int], str | None]] = []
+    current_face_offsets: list[int] = [0]
+    current_face_indices: list[int] = []
+    current_face_textures: list[str | None] = []
     current_curves: list[Curve] = []
     current_surfaces: list[Surface] = []
 
@@ -663,9 +927,9 @@ class Wireframe:
               objects.append(Wireframe(
                 wireframe_id=len(objects),
                 name=current_name,
-                vertices=current_vertices,
-                edges=current_edges,
-                faces=current_faces,
+                vertices=np.array(current_vertices, dtype=float).reshape(-1, 4),
+                edges=np.array(current_edges, dtype=int).reshape(-1, 2),
+                faces=Faces(np.array(current_face_offsets), np.array(current_face_indices, dtype=int), current_face_textures),
                 curves=current_curves,
                 surfaces=current_surfaces
               ))
@@ -673,14 +937,16 @@ class Wireframe:
             current_name = body[0]
             current_vertices = []
             current_edges = []
-            current_faces = []
+            current_face_offsets = [0]
+            current_face_indices = []
+            current_face_textures = []
             current_curves = []
             current_surfaces = []
 
           case 'v':
             if len(body) < 3: raise ValueError(f"Invalid vertex line: {line.strip()}")
             x, y, z = map(float, body[:3])
-            current_vertices.append(np.array([x, y, z, 1.0]))
+            current_vertices.append((x, y, z, 1.0))
           
           case 'l':
             if len(body) < 2: raise ValueError(f"Invalid line (edge) line: {line.strip()}")
@@ -695,11 +961,9 @@ class Wireframe:
 
           case 'f':
             if len(body) < 3: raise ValueError(f"Invalid face line: {line.strip()}")
-            vertices = [int(x.split("//")[0])-1 for x in body]
-            current_faces.append((
-              vertices,
-              current_texture
-            ))
+            current_face_indices.extend(int(x.split("//")[0])-1 for x in body)
+            current_face_offsets.append(len(current_face_indices))
+            current_face_textures.append(current_texture)
             current_texture = None
             
           case 'ctype':  
@@ -753,9 +1017,9 @@ class Wireframe:
     objects.append(Wireframe(
       wireframe_id=len(objects),
       name=current_name,
-      vertices=current_vertices,
-      edges=current_edges,
-      faces=current_faces,
+      vertices=np.array(current_vertices, dtype=float).reshape(-1, 4),
+      edges=np.array(current_edges, dtype=int).reshape(-1, 2),
+      faces=Faces(np.array(current_face_offsets), np.array(current_face_indices, dtype=int), current_face_textures),
       curves=current_curves,
       surfaces=current_surfaces
     ))
@@ -771,46 +1035,67 @@ class Wireframe:
     
     point = point if point is not None else self.center
 
-    # Move the object to be centered around the rotation point.
-    self.translate(*-point[:3])
-    # Apply the rotation matrix.
     M = np.eye(4)
     M[a1, a1] = np.cos(np.radians(degrees))
     M[a1, a2] = -np.sin(np.radians(degrees))
     M[a2, a1] = np.sin(np.radians(degrees))
     M[a2, a2] = np.cos(np.radians(degrees))
-    self.transform(M)
-    # Move the object back to its original position.
-    self.translate(*point[:3])
+    # Move the object to be centered around the rotation point, rotate it and move it back, all in a single matrix
+    self.transform(self.translation_matrix(*point[:3]) @ M @ self.translation_matrix(*-point[:3]))
 
   def translate(self, dx: float, dy: float, dz: float) -> None:
     '''Desloca o objeto em relação ao seu sistema de coordenadas.'''
-    self.transform(np.array([
-      [1, 0, 0, dx],
-      [0, 1, 0, dy],
-      [0, 0, 1, dz],
-      [0, 0, 0, 1]
-    ]))
+    self.transform(self.translation_matrix(dx, dy, dz))
 
   def scale(self, factor: float) -> None:
     '''Escala o objeto em relação ao seu centro.'''
-    self.translate(*-self.center[:3])
-    self.transform(np.array([
+    center = self.center
+    self.transform(self.translation_matrix(*center[:3]) @ np.array([
       [factor, 0, 0, 0],
       [0, factor, 0, 0],
       [0, 0, factor, 0],
       [0, 0, 0, 1]
-    ]))
-    self.translate(*self.center[:3])
+    ]) @ self.translation_matrix(*-center[:3]))
+
+  @staticmethod
+  def translation_matrix(dx: float, dy: float, dz: float) -> np.ndarray:
+    return np.array([
+      [1, 0, 0, dx],
+      [0, 1, 0, dy],
+      [0, 0, 1, dz],
+      [0, 0, 0, 1]
+    ], dtype=float)
 
   def transform(self, M: np.ndarray) -> None:
-    '''Aplica uma transformação linear a todos os vértices do objeto.'''
-    self.vertices = [M @ v for v in self.vertices]
+    '''Aplica uma transformação linear ao objeto, acumulando-a na matriz de modelo sem percorrer os vértices.'''
+    self.model_matrix = M @ self.model_matrix
+    self.version += 1
+
+  def bake(self) -> None:
+    '''Aplica a matriz de modelo acumulada aos vértices e a reinicia como identidade.'''
+    if np.array_equal(self.model_matrix, np.eye(4)): return
+    self.vertices = self.vertices @ self.model_matrix.T
+    self.model_matrix = np.eye(4)
+    # The object didn't move, so its world bounds stay valid. Only the local ones must be recomputed from the new vertices
+    self._local_bounds = None
+
+  @property
+  def world_vertices(self) -> np.ndarray:
+    '''Vértices do objeto no mundo, com as transformações pendentes aplicadas a uma cópia.'''
+    return self.vertices @ self.model_matrix.T
 
+  @property
+  def bounds(self) -> Bounds:
+    '''Volumes envolventes do objeto no mundo. Só percorrem os vértices quando estes mudam; transformações apenas os atualizam pela matriz de modelo.'''
+    if self._bounds is None or self._bounds_version != self.version:
+      if self._local_bounds is None: self._local_bounds = Bounds.from_points(self.vertices)
+      self._bounds = self._local_bounds.transformed(self.model_matrix)
+      self._bounds_version = self.version
+    return self._bounds
 
   @property
   def center(self) -> WorldPoint:
-    return np.mean(self.vertices, axis=0).astype(float)
+    return self.bounds.centroid
 
 
 